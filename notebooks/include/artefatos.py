@@ -0,0 +1,202 @@
+from datetime import datetime
+import hashlib
+import joblib
+import json
+import numpy as np
+import os
+import pandas as pd
+import re
+import shutil
+import sklearn
+import tempfile
+
+
+# Pasta com os artefatos (modelo + pré-processador), uma subpasta por nome e por versão
+PASTA_ARTEFATOS = "../modelos/artefatos"
+
+# Nome padrão do artefato do melhor modelo
+NOME_ARTEFATO = "melhor_modelo"
+
+# Arquivos de cada versão
+ARQUIVO_MODELO = "modelo.joblib"
+ARQUIVO_PREPROCESSADOR = "preprocessador.joblib"
+ARQUIVO_METADADOS = "metadados.json"
+
+# Subpastas das versões (v0001, v0002, ..., v10000)
+PADRAO_VERSAO = re.compile(r"v(\d{4,})")
+
+
+def calcular_hash_dados(*dados):
+    """
+    Calcula o hash (SHA-256) dos dados usados no treino, para identificar com quais dados um artefato foi gerado.
+
+    Parâmetros:
+        - dados: DataFrames, Series ou arrays (ex: X_train, y_train)
+
+    Retorna:
+        - Hash em hexadecimal
+    """
+
+    resumo = hashlib.sha256()
+
+    for valor in dados:
+        if isinstance(valor, (pd.DataFrame, pd.Series)):
+            # Inclui nomes e tipos das colunas, além dos valores
+            resumo.update(pd.util.hash_pandas_object(valor, index=False).to_numpy().tobytes())
+            colunas = list(valor.columns) if isinstance(valor, pd.DataFrame) else [valor.name]
+            resumo.update(repr((colunas, [str(tipo) for tipo in np.atleast_1d(valor.dtypes)])).encode())
+        else:
+            valor = np.ascontiguousarray(valor)
+            resumo.update(repr((valor.shape, str(valor.dtype))).encode())
+            resumo.update(valor.tobytes())
+
+    return resumo.hexdigest()
+
+
+def listar_versoes_artefato(nome=NOME_ARTEFATO, pasta=PASTA_ARTEFATOS):
+    """
+    Lista as versões salvas de um artefato.
+
+    Parâmetros:
+        - nome: Nome do artefato (padrão é NOME_ARTEFATO)
+        - pasta: Pasta dos artefatos (padrão é PASTA_ARTEFATOS)
+
+    Retorna:
+        - DataFrame com os metadados de cada versão, indexado pela versão
+    """
+
+    pasta_artefato = os.path.join(pasta, nome)
+
+    # Pastas de versão sem o arquivo de metadados (ex: restos de uma gravação interrompida) são ignoradas
+    metadados = [_ler_metadados(os.path.join(pasta_artefato, subpasta))
+                 for subpasta in _obter_pastas_versoes(pasta_artefato).values()
+                 if os.path.isfile(os.path.join(pasta_artefato, subpasta, ARQUIVO_METADADOS))]
+
+    return pd.DataFrame(metadados, columns=['versao', 'criado_em', 'modelo', 'hash_dados', 'metricas']).set_index('versao')
+
+
+def salvar_artefato(modelo, preprocessador, hash_dados, nome=NOME_ARTEFATO, pasta=PASTA_ARTEFATOS, metricas=None):
+    """
+    Salva o modelo ajustado e o seu pré-processamento como uma nova versão do artefato.
+
+    Os arquivos são gravados sem compressão, o que torna o carregamento mais rápido (ver carregar_artefato).
+
+    Parâmetros:
+        - modelo: Modelo ajustado
+        - preprocessador: PreProcessador ajustado (ou outro transformador do scikit-learn)
+        - hash_dados: Hash dos dados de treino (ver calcular_hash_dados)
+        - nome: Nome do artefato (padrão é NOME_ARTEFATO)
+        - pasta: Pasta dos artefatos (padrão é PASTA_ARTEFATOS)
+        - metricas: Dicionário com as métricas do modelo (opcional, ex: {'MSE': mse, 'R2': r_quadrado})
+
+    Retorna:
+        - Número da versão salva
+    """
+
+    pasta_artefato = os.path.join(pasta, nome)
+    os.makedirs(pasta_artefato, exist_ok=True)
+
+    # A versão é gravada em uma pasta temporária e só recebe o nome definitivo (vNNNN) quando está completa
+    pasta_temporaria = tempfile.mkdtemp(prefix='.gravando-', dir=pasta_artefato)
+
+    try:
+        joblib.dump(modelo, os.path.join(pasta_temporaria, ARQUIVO_MODELO))
+        joblib.dump(preprocessador, os.path.join(pasta_temporaria, ARQUIVO_PREPROCESSADOR))
+
+        metadados = {
+            'criado_em': datetime.now().isoformat(timespec='seconds'),
+            'modelo': type(modelo).__name__,
+            'parametros': {parametro: repr(valor) for parametro, valor in modelo.get_params(deep=False).items()},
+            'hash_dados': hash_dados,
+            'metricas': {metrica: float(valor) for metrica, valor in (metricas or {}).items()},
+            'versoes_bibliotecas': {'scikit-learn': sklearn.__version__, 'numpy': np.__version__}
+        }
+
+        with open(os.path.join(pasta_temporaria, ARQUIVO_METADADOS), 'w', encoding='utf-8') as arquivo:
+            json.dump(metadados, arquivo, indent=4, ensure_ascii=False)
+
+        # O rename é atômico; se outro processo ocupar o número antes (pasta já existe), tenta o número seguinte
+        while True:
+            versao = max(_obter_pastas_versoes(pasta_artefato), default=0) + 1
+            try:
+                os.rename(pasta_temporaria, os.path.join(pasta_artefato, f"v{versao:04d}"))
+                break
+            except OSError:
+                if not os.path.isdir(os.path.join(pasta_artefato, f"v{versao:04d}")):
+                    raise
+    except BaseException:
+        shutil.rmtree(pasta_temporaria, ignore_errors=True)
+        raise
+
+    return versao
+
+
+def carregar_artefato(nome=NOME_ARTEFATO, pasta=PASTA_ARTEFATOS, versao=None, hash_dados=None, mmap_mode='r'):
+    """
+    Carrega o modelo e o pré-processador de uma versão do artefato, sem precisar executar a modelagem novamente.
+
+    Com mmap_mode='r', os arrays numpy são abertos mapeados em memória (somente leitura), sem a cópia intermediária
+    da leitura do arquivo, o que reduz o tempo de carregamento. O modelo não fica compartilhado entre processos: as
+    árvores do scikit-learn copiam os seus nós para a estrutura interna, então cada processo tem a sua cópia.
+
+    Parâmetros:
+        - nome: Nome do artefato (padrão é NOME_ARTEFATO)
+        - pasta: Pasta dos artefatos (padrão é PASTA_ARTEFATOS)
+        - versao: Versão carregada (padrão é a mais recente)
+        - hash_dados: Hash esperado dos dados de treino (opcional, ver calcular_hash_dados)
+        - mmap_mode: Modo do mapeamento em memória (padrão é 'r'; None carrega tudo na memória)
+
+    Retorna:
+        - Tupla (modelo, preprocessador, metadados)
+    """
+
+    if versao is None:
+        versoes = listar_versoes_artefato(nome, pasta)
+
+        if not len(versoes):
+            raise FileNotFoundError(f"Nenhuma versão do artefato '{nome}' em {pasta}")
+
+        versao = int(versoes.index.max())
+
+    pastas_versoes = _obter_pastas_versoes(os.path.join(pasta, nome))
+    if versao not in pastas_versoes:
+        raise FileNotFoundError(f"Versão {versao} do artefato '{nome}' não encontrada em {pasta}")
+
+    pasta_versao = os.path.join(pasta, nome, pastas_versoes[versao])
+    metadados = _ler_metadados(pasta_versao)
+
+    if hash_dados is not None and metadados['hash_dados'] != hash_dados:
+        raise ValueError(f"A versão {versao} do artefato '{nome}' foi gerada com outros dados de treino")
+
+    modelo = joblib.load(os.path.join(pasta_versao, ARQUIVO_MODELO), mmap_mode=mmap_mode)
+    preprocessador = joblib.load(os.path.join(pasta_versao, ARQUIVO_PREPROCESSADOR), mmap_mode=mmap_mode)
+
+    return modelo, preprocessador, metadados
+
+
+def _obter_pastas_versoes(pasta_artefato):
+    """
+    Subpastas de versão de um artefato (completas ou não), no formato número: nome da pasta, em ordem crescente.
+    """
+
+    subpastas = sorted(os.listdir(pasta_artefato)) if os.path.isdir(pasta_artefato) else []
+    correspondencias = [PADRAO_VERSAO.fullmatch(subpasta) for subpasta in subpastas]
+
+    # Se duas pastas tiverem o mesmo número (ex: v0012 e v00012), vale a primeira em ordem alfabética
+    pastas = {}
+    for correspondencia in correspondencias:
+        if correspondencia:
+            pastas.setdefault(int(correspondencia.group(1)), correspondencia.group(0))
+
+    return dict(sorted(pastas.items()))
+
+
+def _ler_metadados(pasta_versao):
+    """
+    Lê o arquivo de metadados de uma versão, com o número da versão obtido do nome da pasta.
+    """
+
+    with open(os.path.join(pasta_versao, ARQUIVO_METADADOS), encoding='utf-8') as arquivo:
+        metadados = json.load(arquivo)
+
+    return {'versao': int(PADRAO_VERSAO.fullmatch(os.path.basename(pasta_versao)).group(1)), **metadados}
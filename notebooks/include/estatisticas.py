@@ -0,0 +1,614 @@
+from functools import reduce
+import numpy as np
+import pandas as pd
+
+from .utils import dividir_csv_em_intervalos, executar_em_shards, ler_intervalo_csv
+
+
+class CorrelacaoOnline:
+    """
+    Matriz de correlação de Pearson acumulada bloco a bloco, sem manter os dados em memória.
+
+    Para cada par de colunas são acumuladas a quantidade de linhas em que as duas estão preenchidas, as somas,
+    as somas dos quadrados e a soma dos produtos. Assim o resultado é o mesmo do DataFrame.corr() (que também
+    ignora os ausentes par a par), e dois acumuladores das mesmas colunas podem ser combinados de forma exata.
+
+    Os valores são deslocados pela média do primeiro bloco antes de acumular, o que evita a perda de precisão
+    das somas dos quadrados em colunas com valores altos (ex: Encargos). A correlação não muda com o deslocamento.
+
+    Parâmetros:
+        - colunas: Colunas acumuladas (padrão são as colunas numéricas do primeiro bloco)
+    """
+
+    def __init__(self, colunas=None):
+        self.colunas = None if colunas is None else list(colunas)
+        self.deslocamento = None
+        self.contagem = None
+        self.soma = None
+        self.soma_quadrados = None
+        self.soma_produtos = None
+
+    def atualizar(self, chunk):
+        """
+        Acumula um bloco de dados.
+
+        Parâmetros:
+            - chunk: DataFrame com as colunas acumuladas
+
+        Retorna:
+            - O próprio acumulador
+        """
+
+        if self.colunas is None:
+            self.colunas = list(chunk.select_dtypes(include='number').columns)
+
+        valores = chunk[self.colunas].to_numpy(dtype='float64', na_value=np.nan)
+
+        if self.deslocamento is None:
+            with np.errstate(invalid='ignore'):
+                media = np.nanmean(valores, axis=0) if len(valores) else np.zeros(len(self.colunas))
+            self.deslocamento = np.nan_to_num(media)
+            self._zerar()
+
+        preenchidos = ~np.isnan(valores)
+        valores = np.where(preenchidos, valores - self.deslocamento, 0.0)
+        preenchidos = preenchidos.astype('float64')
+
+        # [i, j] considera apenas as linhas em que as colunas i e j estão preenchidas
+        self.contagem += preenchidos.T @ preenchidos
+        self.soma += valores.T @ preenchidos
+        self.soma_quadrados += (valores ** 2).T @ preenchidos
+        self.soma_produtos += valores.T @ valores
+
+        return self
+
+    def combinar(self, outra):
+        """
+        Combina com outro acumulador das mesmas colunas, como se os dois tivessem recebido todos os blocos.
+
+        Parâmetros:
+            - outra: CorrelacaoOnline com as mesmas colunas
+
+        Retorna:
+            - O próprio acumulador
+        """
+
+        if outra.deslocamento is None:
+            return self
+
+        if self.deslocamento is None:
+            self.colunas = list(outra.colunas)
+            self.deslocamento = outra.deslocamento.copy()
+            self._zerar()
+        elif self.colunas != outra.colunas:
+            raise ValueError("Só é possível combinar correlações das mesmas colunas")
+
+        # Converte as somas do outro acumulador para o deslocamento deste: x - b = (x - a) + d, com d = a - b
+        d = outra.deslocamento - self.deslocamento
+        d_linha, d_coluna = d[:, None], d[None, :]
+
+        self.contagem += outra.contagem
+        self.soma += outra.soma + d_linha * outra.contagem
+        self.soma_quadrados += outra.soma_quadrados + 2 * d_linha * outra.soma + d_linha ** 2 * outra.contagem
+        self.soma_produtos += (outra.soma_produtos + d_coluna * outra.soma + d_linha * outra.soma.T +
+                               d_linha * d_coluna * outra.contagem)
+
+        return self
+
+    def matriz_correlacao(self):
+        """
+        Calcula a matriz de correlação de Pearson com os valores acumulados.
+
+        Retorna:
+            - DataFrame (colunas x colunas), no mesmo formato do DataFrame.corr()
+        """
+
+        n = self.contagem
+        covariancia = n * self.soma_produtos - self.soma * self.soma.T
+        variancia = n * self.soma_quadrados - self.soma ** 2
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            correlacao = covariancia / np.sqrt(variancia * variancia.T)
+
+        return pd.DataFrame(np.clip(correlacao, -1, 1), index=self.colunas, columns=self.colunas)
+
+    def _zerar(self):
+        """
+        Inicializa as matrizes acumuladas com zeros.
+        """
+
+        tamanho = (len(self.colunas), len(self.colunas))
+        self.contagem = np.zeros(tamanho)
+        self.soma = np.zeros(tamanho)
+        self.soma_quadrados = np.zeros(tamanho)
+        self.soma_produtos = np.zeros(tamanho)
+
+
+def acumular_correlacao(chunks, colunas=None):
+    """
+    Acumula a matriz de correlação de um iterador de blocos.
+
+    Parâmetros:
+        - chunks: Iterador de DataFrames (ou um único DataFrame)
+        - colunas: Colunas acumuladas (padrão são as colunas numéricas do primeiro bloco)
+
+    Retorna:
+        - CorrelacaoOnline com os valores de todos os blocos
+    """
+
+    if isinstance(chunks, pd.DataFrame):
+        chunks = [chunks]
+
+    correlacao = CorrelacaoOnline(colunas)
+
+    for chunk in chunks:
+        correlacao.atualizar(chunk)
+
+    return correlacao
+
+
+def acumular_correlacao_csv(caminhos_csv, colunas=None, tamanho_chunk=100_000, num_partes=None):
+    """
+    Acumula a matriz de correlação em paralelo: as linhas de cada planilha são divididas em intervalos, cada intervalo
+    é acumulado em um processo e os resultados são combinados ao final.
+
+    Parâmetros:
+        - caminhos_csv: Caminho de uma planilha ou lista de planilhas, cada uma com o seu cabeçalho
+        - colunas: Colunas acumuladas (padrão são as colunas numéricas)
+        - tamanho_chunk: Quantidade de linhas lidas por vez em cada processo
+        - num_partes: Quantidade de intervalos de cada planilha (padrão é o número de CPUs)
+
+    Retorna:
+        - CorrelacaoOnline com os valores de todas as planilhas
+    """
+
+    intervalos = dividir_csv_em_intervalos(caminhos_csv, num_partes)
+    parciais = executar_em_shards(_acumular_correlacao_csv,
+                                  [(*intervalo, colunas, tamanho_chunk) for intervalo in intervalos])
+
+    return reduce(CorrelacaoOnline.combinar, parciais, CorrelacaoOnline(colunas))
+
+
+def _acumular_correlacao_csv(caminho_csv, inicio, quantidade, colunas, tamanho_chunk):
+    """
+    Acumula a matriz de correlação de um intervalo de linhas de uma planilha lido em blocos.
+    """
+
+    return acumular_correlacao(ler_intervalo_csv(caminho_csv, inicio, quantidade, chunksize=tamanho_chunk), colunas)
+
+
+# Valores com módulo abaixo deste limite são tratados como zero pelo SketchQuantis
+VALOR_MINIMO_SKETCH = 1e-9
+
+
+class _ContagensPorIndice:
+    """
+    Contagens indexadas por inteiros (positivos ou negativos), em um array que cresce conforme a faixa de índices.
+    """
+
+    def __init__(self):
+        self.inicio = 0
+        self.contagens = np.zeros(0, dtype='int64')
+
+    def adicionar(self, indices):
+        if len(indices) == 0:
+            return
+
+        self._expandir(int(indices.min()), int(indices.max()))
+        self.contagens += np.bincount(indices - self.inicio, minlength=len(self.contagens))
+
+    def combinar(self, outra):
+        if len(outra.contagens) == 0:
+            return
+
+        self._expandir(outra.inicio, outra.inicio + len(outra.contagens) - 1)
+        deslocamento = outra.inicio - self.inicio
+        self.contagens[deslocamento:deslocamento + len(outra.contagens)] += outra.contagens
+
+    def indices(self):
+        return np.arange(self.inicio, self.inicio + len(self.contagens))
+
+    def _expandir(self, menor, maior):
+        if len(self.contagens) == 0:
+            self.inicio, self.contagens = menor, np.zeros(maior - menor + 1, dtype='int64')
+            return
+
+        fim = self.inicio + len(self.contagens) - 1
+        if menor >= self.inicio and maior <= fim:
+            return
+
+        novo_inicio = min(menor, self.inicio)
+        contagens = np.zeros(max(maior, fim) - novo_inicio + 1, dtype='int64')
+        contagens[self.inicio - novo_inicio:self.inicio - novo_inicio + len(self.contagens)] = self.contagens
+        self.inicio, self.contagens = novo_inicio, contagens
+
+
+class SketchQuantis:
+    """
+    Sketch de quantis com erro relativo limitado (DDSketch): cada valor é contado em um bucket de escala
+    logarítmica, de forma que qualquer quantil é estimado com erro relativo de no máximo precisao_relativa,
+    usando poucos kilobytes independente da quantidade de dados. Dois sketches de mesma precisão podem ser
+    combinados de forma exata.
+
+    Parâmetros:
+        - precisao_relativa: Erro relativo máximo dos quantis (padrão é 1%)
+    """
+
+    def __init__(self, precisao_relativa=0.01):
+        self.precisao_relativa = precisao_relativa
+        self.gama = (1 + precisao_relativa) / (1 - precisao_relativa)
+        self.positivos = _ContagensPorIndice()
+        self.negativos = _ContagensPorIndice()
+        self.zeros = 0
+        self.contagem = 0
+        self.minimo = np.inf
+        self.maximo = -np.inf
+
+    def adicionar(self, valores):
+        """
+        Acumula valores (ausentes são ignorados).
+
+        Parâmetros:
+            - valores: Series ou array com os valores
+
+        Retorna:
+            - O próprio sketch
+        """
+
+        valores = _obter_valores_preenchidos(valores)
+        if len(valores) == 0:
+            return self
+
+        self.contagem += len(valores)
+        self.minimo = min(self.minimo, valores.min())
+        self.maximo = max(self.maximo, valores.max())
+
+        positivos = valores[valores > VALOR_MINIMO_SKETCH]
+        negativos = -valores[valores < -VALOR_MINIMO_SKETCH]
+        self.zeros += len(valores) - len(positivos) - len(negativos)
+
+        self.positivos.adicionar(self._indices(positivos))
+        self.negativos.adicionar(self._indices(negativos))
+
+        return self
+
+    def combinar(self, outro):
+        """
+        Combina com outro sketch de mesma precisão.
+
+        Parâmetros:
+            - outro: SketchQuantis com a mesma precisao_relativa
+
+        Retorna:
+            - O próprio sketch
+        """
+
+        if outro.precisao_relativa != self.precisao_relativa:
+            raise ValueError("Só é possível combinar sketches com a mesma precisão relativa")
+
+        self.positivos.combinar(outro.positivos)
+        self.negativos.combinar(outro.negativos)
+        self.zeros += outro.zeros
+        self.contagem += outro.contagem
+        self.minimo = min(self.minimo, outro.minimo)
+        self.maximo = max(self.maximo, outro.maximo)
+
+        return self
+
+    def quantil(self, q):
+        """
+        Estima um ou mais quantis.
+
+        Parâmetros:
+            - q: Quantil (ou array de quantis) entre 0 e 1
+
+        Retorna:
+            - Valor estimado de cada quantil (NaN quando o sketch está vazio)
+        """
+
+        if self.contagem == 0:
+            return np.full(np.shape(q), np.nan)[()]
+
+        valores, contagens = self.valores_e_contagens()
+        posicoes = np.asarray(q, dtype='float64') * (self.contagem - 1)
+        buckets = np.searchsorted(np.cumsum(contagens), posicoes, side='right')
+
+        return np.clip(valores[np.minimum(buckets, len(valores) - 1)], self.minimo, self.maximo)[()]
+
+    def valores_e_contagens(self):
+        """
+        Obtém o valor representativo e a contagem de cada bucket, em ordem crescente de valor.
+
+        Retorna:
+            - Tupla (valores, contagens)
+        """
+
+        valores = [-self._valor_bucket(self.negativos.indices())[::-1], [0.0], self._valor_bucket(self.positivos.indices())]
+        contagens = [self.negativos.contagens[::-1], [self.zeros], self.positivos.contagens]
+
+        valores, contagens = np.concatenate(valores), np.concatenate(contagens)
+        preenchidos = contagens > 0
+
+        return valores[preenchidos], contagens[preenchidos]
+
+    def _indices(self, valores):
+        return np.ceil(np.log(valores) / np.log(self.gama)).astype('int64')
+
+    def _valor_bucket(self, indices):
+        # Ponto do bucket (gama^(i-1), gama^i] com erro relativo máximo igual a precisao_relativa
+        return 2 * self.gama ** indices / (self.gama + 1)
+
+
+class HistogramaFixo:
+    """
+    Histograma com bins de largura fixa, que pode ser acumulado bloco a bloco e combinado.
+
+    Os bins são finos (ex: largura 1 para idades) e podem ser reagrupados em intervalos maiores na hora do gráfico.
+
+    Parâmetros:
+        - largura: Largura de cada bin (padrão é 1)
+        - origem: Borda inicial de referência dos bins (padrão é 0)
+    """
+
+    def __init__(self, largura=1, origem=0):
+        self.largura = largura
+        self.origem = origem
+        self.bins = _ContagensPorIndice()
+
+    def adicionar(self, valores):
+        """
+        Acumula valores (ausentes são ignorados).
+
+        Parâmetros:
+            - valores: Series ou array com os valores
+
+        Retorna:
+            - O próprio histograma
+        """
+
+        valores = _obter_valores_preenchidos(valores)
+        self.bins.adicionar(np.floor((valores - self.origem) / self.largura).astype('int64'))
+
+        return self
+
+    def combinar(self, outro):
+        """
+        Combina com outro histograma de mesma largura e origem.
+
+        Parâmetros:
+            - outro: HistogramaFixo com a mesma largura e origem
+
+        Retorna:
+            - O próprio histograma
+        """
+
+        if (outro.largura, outro.origem) != (self.largura, self.origem):
+            raise ValueError("Só é possível combinar histogramas com a mesma largura e origem")
+
+        self.bins.combinar(outro.bins)
+
+        return self
+
+    @property
+    def minimo(self):
+        """
+        Borda inicial do primeiro bin preenchido.
+        """
+
+        return self.origem + self.bins.indices()[self.bins.contagens > 0].min() * self.largura
+
+    @property
+    def maximo(self):
+        """
+        Borda inicial do último bin preenchido (para valores inteiros com largura 1, o próprio valor máximo).
+        """
+
+        return self.origem + self.bins.indices()[self.bins.contagens > 0].max() * self.largura
+
+    def reagrupar(self, inicio, fim, intervalo):
+        """
+        Reagrupa os bins em intervalos maiores.
+
+        Parâmetros:
+            - inicio: Borda inicial do primeiro intervalo
+            - fim: Valor que o último intervalo deve alcançar (incluído nele)
+            - intervalo: Largura de cada intervalo (de preferência múltiplo da largura dos bins)
+
+        Retorna:
+            - Tupla (bordas, contagens), no mesmo formato de np.histogram
+        """
+
+        quantidade = max(int(np.ceil((fim - inicio) / intervalo)), 1)
+        bordas = inicio + intervalo * np.arange(quantidade + 1)
+        inicios_bins = self.origem + self.bins.indices() * self.largura
+        grupos = np.floor((inicios_bins - inicio) / intervalo).astype('int64')
+
+        # Assim como no np.histogram, o último intervalo inclui a borda final
+        grupos[inicios_bins == bordas[-1]] = quantidade - 1
+
+        dentro = (grupos >= 0) & (grupos < quantidade)
+        contagens = np.bincount(grupos[dentro], weights=self.bins.contagens[dentro], minlength=quantidade)
+
+        return bordas, contagens.astype('int64')
+
+
+class ResumoColuna:
+    """
+    Resumo da distribuição de uma coluna (contagens, quantis e, opcionalmente, histograma) acumulado bloco a bloco.
+
+    Parâmetros:
+        - precisao_relativa: Erro relativo máximo dos quantis (padrão é 1%)
+        - largura_histograma: Largura dos bins do histograma (None não acumula histograma)
+    """
+
+    def __init__(self, precisao_relativa=0.01, largura_histograma=None):
+        self.ausentes = 0
+        self.sketch = SketchQuantis(precisao_relativa)
+        self.histograma = None if largura_histograma is None else HistogramaFixo(largura_histograma)
+
+    def adicionar(self, serie):
+        """
+        Acumula os valores de uma coluna.
+
+        Parâmetros:
+            - serie: Series com os valores
+
+        Retorna:
+            - O próprio resumo
+        """
+
+        valores = serie.to_numpy(dtype='float64', na_value=np.nan)
+        valores = valores[~np.isnan(valores)]
+
+        self.ausentes += len(serie) - len(valores)
+        self.sketch.adicionar(valores)
+        if self.histograma is not None:
+            self.histograma.adicionar(valores)
+
+        return self
+
+    def combinar(self, outro):
+        """
+        Combina com o resumo da mesma coluna acumulado em outro shard.
+
+        Parâmetros:
+            - outro: ResumoColuna com a mesma configuração
+
+        Retorna:
+            - O próprio resumo
+        """
+
+        self.ausentes += outro.ausentes
+        self.sketch.combinar(outro.sketch)
+        if self.histograma is not None:
+            self.histograma.combinar(outro.histograma)
+
+        return self
+
+    def estatisticas_boxplot(self, rotulo, whis=1.5):
+        """
+        Calcula as estatísticas de um boxplot no formato aceito pelo Axes.bxp do matplotlib.
+
+        Os bigodes vão até o valor mais extremo dentro de whis * IQR dos quartis. Como os valores individuais não são
+        mantidos, apenas o mínimo e o máximo aparecem como outliers quando ficam fora dos bigodes.
+
+        Parâmetros:
+            - rotulo: Rótulo do boxplot
+            - whis: Multiplicador do intervalo interquartil usado nos bigodes (padrão é 1.5, o mesmo do seaborn)
+
+        Retorna:
+            - Dicionário com as estatísticas do boxplot
+        """
+
+        q1, mediana, q3 = self.sketch.quantil([0.25, 0.5, 0.75])
+        limite_inferior, limite_superior = q1 - whis * (q3 - q1), q3 + whis * (q3 - q1)
+
+        valores, _ = self.sketch.valores_e_contagens()
+        dentro = valores[(valores >= limite_inferior) & (valores <= limite_superior)]
+        minimo, maximo = self.sketch.minimo, self.sketch.maximo
+
+        return {
+            'label': rotulo,
+            'med': mediana,
+            'q1': q1,
+            'q3': q3,
+            'whislo': max(dentro.min(), minimo) if len(dentro) else q1,
+            'whishi': min(dentro.max(), maximo) if len(dentro) else q3,
+            'fliers': [valor for valor in (minimo, maximo) if valor < limite_inferior or valor > limite_superior]
+        }
+
+
+def acumular_resumos(chunks, colunas=None, histogramas=None, precisao_relativa=0.01):
+    """
+    Acumula em uma única passada o resumo da distribuição (quantis e histogramas) de várias colunas.
+
+    Parâmetros:
+        - chunks: Iterador de DataFrames (ou um único DataFrame)
+        - colunas: Colunas resumidas (padrão são as colunas numéricas do primeiro bloco)
+        - histogramas: Dicionário coluna: largura dos bins, das colunas que também acumulam histograma
+          (ex: {'Idade': 1})
+        - precisao_relativa: Erro relativo máximo dos quantis (padrão é 1%)
+
+    Retorna:
+        - Dicionário coluna: ResumoColuna
+    """
+
+    if isinstance(chunks, pd.DataFrame):
+        chunks = [chunks]
+
+    histogramas = histogramas or {}
+    resumos = None
+
+    for chunk in chunks:
+        if resumos is None:
+            colunas = list(chunk.select_dtypes(include='number').columns) if colunas is None else colunas
+            resumos = {coluna: ResumoColuna(precisao_relativa, histogramas.get(coluna)) for coluna in colunas}
+
+        for coluna, resumo in resumos.items():
+            resumo.adicionar(chunk[coluna])
+
+    return resumos
+
+
+def combinar_resumos(resumos, outros):
+    """
+    Combina os resumos de dois shards (ver acumular_resumos).
+
+    Parâmetros:
+        - resumos: Dicionário coluna: ResumoColuna, alterado no próprio objeto
+        - outros: Dicionário coluna: ResumoColuna com as mesmas colunas
+
+    Retorna:
+        - Os próprios resumos combinados
+    """
+
+    for coluna, resumo in resumos.items():
+        resumo.combinar(outros[coluna])
+
+    return resumos
+
+
+def acumular_resumos_csv(caminhos_csv, colunas=None, histogramas=None, precisao_relativa=0.01, tamanho_chunk=100_000,
+                         num_partes=None):
+    """
+    Acumula os resumos em paralelo: as linhas de cada planilha são divididas em intervalos, cada intervalo é acumulado
+    em um processo e os resultados são combinados ao final.
+
+    Parâmetros:
+        - caminhos_csv: Caminho de uma planilha ou lista de planilhas, cada uma com o seu cabeçalho
+        - colunas, histogramas, precisao_relativa: ver acumular_resumos
+        - tamanho_chunk: Quantidade de linhas lidas por vez em cada processo
+        - num_partes: Quantidade de intervalos de cada planilha (padrão é o número de CPUs)
+
+    Retorna:
+        - Dicionário coluna: ResumoColuna
+    """
+
+    intervalos = dividir_csv_em_intervalos(caminhos_csv, num_partes)
+    parciais = executar_em_shards(_acumular_resumos_csv,
+                                  [(*intervalo, colunas, histogramas, precisao_relativa, tamanho_chunk)
+                                   for intervalo in intervalos])
+
+    return reduce(combinar_resumos, parciais[1:], parciais[0]) if parciais else {}
+
+
+def _acumular_resumos_csv(caminho_csv, inicio, quantidade, colunas, histogramas, precisao_relativa, tamanho_chunk):
+    """
+    Acumula os resumos de um intervalo de linhas de uma planilha lido em blocos.
+    """
+
+    return acumular_resumos(ler_intervalo_csv(caminho_csv, inicio, quantidade, chunksize=tamanho_chunk), colunas,
+                            histogramas, precisao_relativa)
+
+
+def _obter_valores_preenchidos(valores):
+    """
+    Converte uma Series ou array para float64, descartando os ausentes.
+    """
+
+    if isinstance(valores, pd.Series):
+        valores = valores.to_numpy(dtype='float64', na_value=np.nan)
+
+    valores = np.asarray(valores, dtype='float64')
+
+    return valores[~np.isnan(valores)]
@@ -1,33 +1,66 @@
-import matplotlib.pyplot as plt
+from concurrent.futures import ProcessPoolExecutor
+import hashlib
+import inspect
+import json
 import numpy as np
+import os
 import pandas as pd
+import pickle
 import textwrap
+import warnings
 
+from .estatisticas import HistogramaFixo
+from .utils import NAO_INFORMADO, ModuloSobDemanda, obter_gerador_aleatorio
 
-def montar_graficos_visualizacao_inicial(dados):
+
+# O matplotlib só é importado ao montar o primeiro gráfico
+plt = ModuloSobDemanda('matplotlib.pyplot')
+colecoes = ModuloSobDemanda('matplotlib.collections')
+
+# Colunas contadas nos gráficos de visualização inicial
+COLUNAS_VISUALIZACAO_INICIAL = ['Gênero', 'Fumante', 'Filhos', 'Região', 'Categoria_IMC']
+
+# Colunas em que os valores ausentes aparecem como NAO_INFORMADO nos gráficos de visualização inicial
+COLUNAS_AUSENTES_INFORMADOS = ['Gênero', 'Fumante', 'Região']
+
+# Colunas contadas nos gráficos dos dados futuros
+COLUNAS_DADOS_FUTUROS = ['Grupos Risco', 'Expectativa Plano de Saúde', 'Planos estratégicos']
+
+# Quantidade máxima de registros desenhados na comparação entre encargos reais e futuros
+LIMITE_PONTOS_COMPARACAO = 5_000
+
+# Quantidade de registros a partir da qual os gráficos de correlação passam a ser de densidade
+LIMITE_PONTOS_DISPERSAO = 50_000
+
+# Pasta padrão dos gráficos exportados
+PASTA_GRAFICOS = "../graficos"
+
+# Arquivo, dentro da pasta dos gráficos, com o hash do conteúdo de cada gráfico exportado
+ARQUIVO_CACHE_GRAFICOS = "cache_graficos.json"
+
+
+def montar_graficos_visualizacao_inicial(dados, distribuicoes=None):
     """
     Monta e exibe gráficos para visualização inicial dos dados, incluindo distribuições de gênero, fumante, número de filhos, região e IMC.
     
     Parâmetros:
         - dados: DataFrame contendo os dados a serem visualizados.
+        - distribuicoes: Contagens já calculadas com contar_distribuicoes (opcional, ex: acumuladas bloco a bloco
+          em uma etapa anterior). Quando None, são calculadas a partir dos dados.
     
     Retorna:
         - Exibe os gráficos na saída padrão.
     """
     
-    dados_aux = dados.copy()
-
-    # Mudando exibição dos dados vazios para aparecer no gráfico
-    dados_aux['Gênero'] = dados_aux['Gênero'].fillna('Não informado')
-    dados_aux['Fumante'] = dados_aux['Fumante'].fillna('Não informado')
-    dados_aux['Região'] = dados_aux['Região'].fillna('Não informado')
+    # Contar o número de ocorrências de algumas colunas (dados vazios aparecem como 'Não informado' no gráfico)
+    if distribuicoes is None:
+        distribuicoes = contar_distribuicoes(dados, COLUNAS_VISUALIZACAO_INICIAL, COLUNAS_AUSENTES_INFORMADOS)
 
-    # Contar o número de ocorrências de algumas colunas
-    distribuicao_genero = dados_aux['Gênero'].value_counts().sort_index()
-    distribuicao_imc = dados_aux['Categoria_IMC'].value_counts().sort_index()
-    distribuicao_filhos = dados_aux['Filhos'].value_counts().sort_index()
-    distribuicao_regiao = dados_aux['Região'].value_counts().sort_index()
-    distribuicao_fumante = dados_aux['Fumante'].value_counts().sort_index()
+    distribuicao_genero = distribuicoes['Gênero']
+    distribuicao_imc = distribuicoes['Categoria_IMC']
+    distribuicao_filhos = distribuicoes['Filhos']
+    distribuicao_regiao = distribuicoes['Região']
+    distribuicao_fumante = distribuicoes['Fumante']
 
     # Criar uma figura e uma grade de subplots
     fig, axs = plt.subplots(3, 2, figsize=(20, 20))
@@ -57,6 +90,73 @@ def montar_graficos_visualizacao_inicial(dados):
     plt.show()
 
 
+def contar_ocorrencias(serie):
+    """
+    Conta as ocorrências de cada valor de uma coluna, ordenadas pelo valor.
+
+    Parâmetros:
+        - serie: Series com os dados a serem contados.
+
+    Retorna:
+        - Series com a contagem de cada valor. Categorias sem registros (colunas categóricas) são descartadas.
+    """
+
+    contagem = _contar_valores(serie, informar_ausentes=False).sort_index()
+
+    return contagem[contagem > 0]
+
+
+def contar_distribuicoes(dados, colunas, colunas_ausentes=None):
+    """
+    Conta as ocorrências de cada valor de várias colunas, sem copiar os dados e com uma única leitura de cada coluna
+    (os códigos das colunas categóricas, ou um factorize nas demais).
+
+    Parâmetros:
+        - dados: DataFrame ou iterador de DataFrames (as contagens dos blocos são somadas).
+        - colunas: Colunas contadas.
+        - colunas_ausentes: Colunas em que os valores ausentes são contados como NAO_INFORMADO (nas demais, eles
+          são descartados, como no value_counts).
+
+    Retorna:
+        - Dicionário coluna: Series com a contagem de cada valor, no mesmo formato do contar_ocorrencias.
+    """
+
+    if isinstance(dados, pd.DataFrame):
+        dados = [dados]
+
+    colunas_ausentes = colunas_ausentes or []
+    distribuicoes = {}
+
+    for chunk in dados:
+        for coluna in colunas:
+            contagem = _contar_valores(chunk[coluna], coluna in colunas_ausentes)
+            if coluna in distribuicoes:
+                contagem = distribuicoes[coluna].add(contagem, fill_value=0).astype('int64')
+            distribuicoes[coluna] = contagem
+
+    return {coluna: contagem[contagem > 0].sort_index() for coluna, contagem in distribuicoes.items()}
+
+
+def _contar_valores(serie, informar_ausentes):
+    """
+    Conta as ocorrências de cada valor com np.bincount sobre os códigos da coluna (categorias sem registros ficam com zero).
+    """
+
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        codigos, valores = serie.cat.codes.to_numpy(), serie.cat.categories
+    else:
+        codigos, valores = pd.factorize(serie)
+
+    contagens = np.bincount(codigos[codigos >= 0], minlength=len(valores))
+    contagem = pd.Series(contagens, index=pd.Index(valores, name=serie.name), name='count')
+
+    ausentes = len(codigos) - contagens.sum()
+    if informar_ausentes and ausentes:
+        contagem.loc[NAO_INFORMADO] = contagem.get(NAO_INFORMADO, 0) + ausentes
+
+    return contagem
+
+
 def montar_grafico_barra_vertical(dados, axs, titulo, eixo_x, eixo_y, medida_x=None, medida_y=None):
     """
     Monta e exibe um gráfico de barras verticais.
@@ -113,7 +213,8 @@ def montar_grafico_barra_horizontal(dados, axs, titulo, eixo_x, eixo_y):
     # Quebrar os rótulos das barras
     if isinstance(dados.index, pd.Index):
         rotulos_ajustados = [textwrap.fill(str(label), largura_maxima_rotulos) for label in dados.index]
-        dados.index = rotulos_ajustados
+        # Os rótulos são trocados em uma cópia, para não alterar os dados recebidos (ex: distribuições reaproveitadas)
+        dados = dados.set_axis(rotulos_ajustados)
 
     # Plotar o gráfico de barras horizontais
     dados.plot(kind='barh', title=titulo, ax=axs)
@@ -178,10 +279,14 @@ def montar_graficos_relacionamento_encargos(dados):
     plt.show()
 
 
-def montar_grafico_correlacao(dados1, dados2, axs, titulo, eixo_x, eixo_y):
+def montar_grafico_correlacao(dados1, dados2, axs, titulo, eixo_x, eixo_y, modo=None, limite_pontos=LIMITE_PONTOS_DISPERSAO,
+                              estratos=None, rng=None):
     """
     Monta e exibe um gráfico de dispersão para visualizar a correlação entre duas variáveis.
     
+    Acima de limite_pontos registros o gráfico passa a ser de densidade (hexbin), cujo custo de desenho não depende
+    da quantidade de dados e que continua legível onde a dispersão viraria uma mancha sólida.
+    
     Parâmetros:
         - dados1: Valores da primeira variável.
         - dados2: Valores da segunda variável.
@@ -189,12 +294,39 @@ def montar_grafico_correlacao(dados1, dados2, axs, titulo, eixo_x, eixo_y):
         - titulo: Título do gráfico.
         - eixo_x: Rótulo do eixo x.
         - eixo_y: Rótulo do eixo y.
+        - modo: 'dispersao', 'densidade' ou 'amostra' (dispersão de uma amostra estratificada com limite_pontos
+          registros). O padrão é 'dispersao' até limite_pontos registros e 'densidade' acima disso.
+        - limite_pontos: Quantidade máxima de pontos da dispersão (padrão é LIMITE_PONTOS_DISPERSAO).
+        - estratos: Valores que definem os estratos da amostra (ex: dados['Fumante']). O padrão são 20 faixas de
+          mesma largura da primeira variável.
+        - rng: np.random.Generator ou semente usada na amostra.
     
     Retorna:
         - Exibe o gráfico de dispersão na saída padrão.
     """
     
-    axs.scatter(dados1, dados2, alpha=1, color='green')
+    if modo is None:
+        modo = 'densidade' if len(dados1) > limite_pontos else 'dispersao'
+
+    if modo == 'densidade':
+        x = pd.Series(dados1).to_numpy(dtype='float64', na_value=np.nan)
+        y = pd.Series(dados2).to_numpy(dtype='float64', na_value=np.nan)
+        preenchidos = ~(np.isnan(x) | np.isnan(y))
+
+        densidade = axs.hexbin(x[preenchidos], y[preenchidos], gridsize=60, cmap='Greens', mincnt=1, bins='log')
+        axs.figure.colorbar(densidade, ax=axs, label='Quantidade de registros')
+    elif modo == 'amostra':
+        if estratos is None:
+            estratos = pd.cut(pd.Series(dados1).astype('float64'), bins=20, labels=False)
+
+        indices = amostrar_estratificado(estratos, limite_pontos, rng)
+        axs.scatter(pd.Series(dados1).iloc[indices], pd.Series(dados2).iloc[indices], alpha=1, color='green')
+        titulo += f' (amostra de {len(indices)} de {len(dados1)} registros)'
+    elif modo == 'dispersao':
+        axs.scatter(dados1, dados2, alpha=1, color='green')
+    else:
+        raise ValueError(f"Modo '{modo}' não suportado, use 'dispersao', 'densidade' ou 'amostra'")
+
     axs.set_title(titulo, fontsize=12, fontweight='bold')
     axs.set_xlabel(eixo_x, fontsize=12)
     axs.set_ylabel(eixo_y, fontsize=12)
@@ -203,6 +335,34 @@ def montar_grafico_correlacao(dados1, dados2, axs, titulo, eixo_x, eixo_y):
     # plt.xticks(range(0, int(dados1.max()) + 1, 1))
 
 
+def amostrar_estratificado(estratos, limite, rng=None):
+    """
+    Sorteia uma amostra estratificada, com cada estrato representado na mesma proporção dos dados (e ao menos um registro).
+    
+    Parâmetros:
+        - estratos: Series ou array com o estrato de cada registro (ausentes formam um estrato próprio).
+        - limite: Tamanho aproximado da amostra.
+        - rng: np.random.Generator ou semente.
+    
+    Retorna:
+        - Array ordenado com as posições dos registros sorteados.
+    """
+    
+    codigos = pd.factorize(np.asarray(estratos), use_na_sentinel=True)[0] + 1
+    if len(codigos) <= limite:
+        return np.arange(len(codigos))
+
+    # Embaralha os registros e os agrupa por estrato, mantendo a ordem aleatória dentro de cada estrato
+    ordem = obter_gerador_aleatorio(rng).permutation(len(codigos))
+    ordem = ordem[np.argsort(codigos[ordem], kind='stable')]
+
+    contagens = np.bincount(codigos)
+    cotas = np.minimum(np.maximum(np.round(contagens * limite / len(codigos)), 1), contagens)
+    posicoes = np.arange(len(codigos)) - np.repeat(np.cumsum(contagens) - contagens, contagens)
+
+    return np.sort(ordem[posicoes < np.repeat(cotas, contagens)])
+
+
 def montar_grafico_linha_com_media(dados, axs, campo1, campo2, titulo, eixo_x, eixo_y):
     """
     Monta e exibe um gráfico de linha com a média de uma variável agrupada por outra variável.
@@ -255,7 +415,8 @@ def montar_grafico_histograma_idade(dados, titulo, eixo_x, eixo_y):
     Monta e exibe um histograma para visualização da distribuição da idade nos dados.
     
     Parâmetros:
-        - dados: DataFrame contendo os dados para análise.
+        - dados: DataFrame contendo os dados para análise, ou o HistogramaFixo da idade já acumulado
+          (ex: acumular_resumos(..., histogramas={'Idade': 1})['Idade'].histograma).
         - titulo: Título do gráfico.
         - eixo_x: Rótulo do eixo x.
         - eixo_y: Rótulo do eixo y.
@@ -264,17 +425,20 @@ def montar_grafico_histograma_idade(dados, titulo, eixo_x, eixo_y):
         - Exibe o histograma na saída padrão.
     """
     
+    # O histograma é desenhado a partir das contagens, sem passar os valores individuais para o matplotlib
+    histograma = HistogramaFixo().adicionar(dados['Idade']) if isinstance(dados, pd.DataFrame) else dados
+
     # Calcula o intervalo para os bins começando do valor mínimo de idade
-    min_idade = int(np.floor(dados['Idade'].min()))
-    max_idade = int(np.ceil(dados['Idade'].max()))
+    min_idade = int(np.floor(histograma.minimo))
+    max_idade = int(np.ceil(histograma.maximo))
     intervalo = 5
-    bins = range(min_idade, max_idade + intervalo, intervalo)
+    bordas, contagens = histograma.reagrupar(min_idade, max_idade, intervalo)
 
     # Criar uma figura e uma grade de subplots
     fig, ax = plt.subplots(figsize=(10, 5))
 
     # Criar o gráfico de linha da distribuição das idades
-    counts, bins, patches = ax.hist(dados['Idade'], bins=bins, edgecolor='black', rwidth=0.8)
+    counts, bins, patches = ax.hist(bordas[:-1], bins=bordas, weights=contagens, edgecolor='black', rwidth=0.8)
 
     ax.set_title(titulo, fontsize=12, fontweight='bold')
     ax.set_xlabel(eixo_x)
@@ -290,12 +454,57 @@ def montar_grafico_histograma_idade(dados, titulo, eixo_x, eixo_y):
     plt.show()
 
 
-def montar_graficos_dados_futuros(dados_futuros):
+def montar_grafico_boxplot(resumos, ax, titulo=None):
+    """
+    Monta boxplots das colunas a partir dos resumos acumulados (quartis e bigodes estimados pelos sketches),
+    sem precisar dos dados completos em memória.
+    
+    Parâmetros:
+        - resumos: Dicionário coluna: ResumoColuna (ver acumular_resumos).
+        - ax: Eixo onde os boxplots são desenhados.
+        - titulo: Título do gráfico (opcional).
+    
+    Retorna:
+        - Dicionário com os elementos desenhados, o mesmo do Axes.bxp.
+    """
+    
+    estatisticas = [resumo.estatisticas_boxplot(coluna) for coluna, resumo in resumos.items()]
+    elementos = ax.bxp(estatisticas, patch_artist=True, boxprops={'facecolor': 'skyblue'})
+
+    if titulo:
+        ax.set_title(titulo, fontsize=12, fontweight='bold')
+
+    return elementos
+
+
+def amostrar_indices(quantidade, limite):
+    """
+    Obtém os índices dos registros desenhados em um gráfico, limitando a quantidade de pontos.
+    
+    Parâmetros:
+        - quantidade: Quantidade de registros.
+        - limite: Quantidade máxima de pontos.
+    
+    Retorna:
+        - Array com todos os índices, ou com limite índices uniformemente espaçados quando a quantidade é maior.
+    """
+    
+    if quantidade <= limite:
+        return np.arange(quantidade)
+
+    return np.unique(np.linspace(0, quantidade - 1, limite).round().astype('int64'))
+
+
+def montar_graficos_dados_futuros(dados_futuros, limite_pontos=LIMITE_PONTOS_COMPARACAO, distribuicoes=None):
     """
     Monta e exibe gráficos para análise dos dados futuros, incluindo comparação entre encargos reais e futuros, distribuição por expectativa de plano de saúde, planos estratégicos e grupos de risco.
     
     Parâmetros:
         - dados_futuros: DataFrame contendo os dados futuros a serem analisados.
+        - limite_pontos: Quantidade máxima de registros desenhados na comparação entre encargos; acima dela é usada
+          uma amostra uniformemente espaçada pelos índices (padrão é LIMITE_PONTOS_COMPARACAO).
+        - distribuicoes: Contagens já calculadas com contar_distribuicoes (opcional). Quando None, são calculadas a
+          partir dos dados futuros.
     
     Retorna:
         - Exibe os gráficos na saída padrão.
@@ -308,24 +517,31 @@ def montar_graficos_dados_futuros(dados_futuros):
     plt.subplots_adjust(left=0.1, right=0.9, bottom=0.3, top=0.7, wspace=0.3, hspace=1.0)
 
     # Contar o número de ocorrências de algumas colunas
-    distribuicao_grupos_risco = dados_futuros['Grupos Risco'].value_counts().sort_index()
-    distribuicao_expectativa_plano_saude = dados_futuros['Expectativa Plano de Saúde'].value_counts().sort_index()
-    distribuicao_planos_estrategicos = dados_futuros['Planos estratégicos'].value_counts().sort_index()
+    if distribuicoes is None:
+        distribuicoes = contar_distribuicoes(dados_futuros, COLUNAS_DADOS_FUTUROS)
+
+    distribuicao_grupos_risco = distribuicoes['Grupos Risco']
+    distribuicao_expectativa_plano_saude = distribuicoes['Expectativa Plano de Saúde']
+    distribuicao_planos_estrategicos = distribuicoes['Planos estratégicos']
 
     # Gráfico Comparação entre Encargos Reais e Encargos Futuro
-    indices = range(len(dados_futuros))
-    axs[0].scatter(indices, dados_futuros['Encargos Reais'], color='blue', label='Encargos Reais', marker='o')
-    axs[0].scatter(indices, dados_futuros['Encargos Futuro'], color='red', label='Encargos Futuro', marker='o')
+    indices = amostrar_indices(len(dados_futuros), limite_pontos)
+    encargos_reais = dados_futuros['Encargos Reais'].to_numpy(dtype='float64')[indices]
+    encargos_futuro = dados_futuros['Encargos Futuro'].to_numpy(dtype='float64')[indices]
+    axs[0].scatter(indices, encargos_reais, color='blue', label='Encargos Reais', marker='o')
+    axs[0].scatter(indices, encargos_futuro, color='red', label='Encargos Futuro', marker='o')
 
-    # Adicionando linhas de conexão entre pares correspondentes
-    for i in indices:
-        axs[0].plot([i, i], [dados_futuros['Encargos Reais'][i], dados_futuros['Encargos Futuro'][i]], color='gray',
-                       linestyle='-', linewidth=0.5)
+    # Adicionando linhas de conexão entre pares correspondentes, todas em uma única coleção
+    segmentos = np.stack([np.column_stack([indices, encargos_reais]), np.column_stack([indices, encargos_futuro])], axis=1)
+    axs[0].add_collection(colecoes.LineCollection(segmentos, colors='gray', linestyles='-', linewidths=0.5))
 
     # Configurações para o gráfico de comparação entre encargos reais e futuros
     axs[0].set_xlabel('Índice', fontsize=12)
     axs[0].set_ylabel('Valor', fontsize=12)
-    axs[0].set_title('Comparação entre Encargos Reais e Encargos Futuro')
+    titulo = 'Comparação entre Encargos Reais e Encargos Futuro'
+    if len(indices) < len(dados_futuros):
+        titulo += f' (amostra de {len(indices)} de {len(dados_futuros)} registros)'
+    axs[0].set_title(titulo)
     axs[0].legend()
 
     montar_grafico_barra_horizontal(distribuicao_expectativa_plano_saude, axs[1], 'Distribuição por Expectativa Plano de Saúde',
@@ -342,4 +558,202 @@ def montar_graficos_dados_futuros(dados_futuros):
 
     # Configurar layout
     plt.tight_layout()
-    plt.show()
\ No newline at end of file
+    plt.show()
+
+
+def exportar_graficos(graficos, pasta=PASTA_GRAFICOS, formato='png', dpi=100, num_processos=None, forcar=False):
+    """
+    Exporta gráficos para arquivos sem exibi-los, renderizando cada gráfico em um processo separado com o
+    backend não interativo Agg.
+    
+    Cada gráfico é guardado com um hash da função, dos dados e dos parâmetros usados. Ao exportar novamente,
+    só são redesenhados os gráficos cujo hash mudou ou cujo arquivo não existe mais.
+    
+    Parâmetros:
+        - graficos: Dicionário nome: (funcao, argumentos) ou (funcao, argumentos, argumentos_nomeados), em que
+          funcao cria a própria figura (ex: montar_grafico_histograma_idade) e precisa ser definida no nível do módulo.
+        - pasta: Pasta dos arquivos exportados (padrão é PASTA_GRAFICOS).
+        - formato: Formato dos arquivos, 'png' ou 'svg'.
+        - dpi: Resolução dos arquivos PNG.
+        - num_processos: Quantidade de processos (padrão é o número de CPUs).
+        - forcar: Redesenha todos os gráficos, ignorando o cache.
+    
+    Retorna:
+        - Dicionário nome: caminho do arquivo exportado.
+    """
+    
+    if formato not in ('png', 'svg'):
+        raise ValueError(f"Formato '{formato}' não suportado, use 'png' ou 'svg'")
+
+    os.makedirs(pasta, exist_ok=True)
+    caminho_cache = os.path.join(pasta, ARQUIVO_CACHE_GRAFICOS)
+
+    cache = {}
+    if os.path.exists(caminho_cache):
+        with open(caminho_cache, encoding='utf-8') as arquivo:
+            cache = json.load(arquivo)
+
+    caminhos, pendentes = {}, []
+    for nome, (funcao, argumentos, *argumentos_nomeados) in graficos.items():
+        argumentos_nomeados = argumentos_nomeados[0] if argumentos_nomeados else {}
+        arquivo = f'{nome}.{formato}'
+        caminhos[nome] = os.path.join(pasta, arquivo)
+        chave = obter_hash_grafico(funcao, argumentos, argumentos_nomeados, dpi)
+
+        if forcar or cache.get(arquivo) != chave or not os.path.exists(caminhos[nome]):
+            pendentes.append((funcao, argumentos, argumentos_nomeados, caminhos[nome], dpi))
+            cache[arquivo] = chave
+
+    # Mesmo um único gráfico é renderizado em outro processo, para não trocar o backend nem fechar as figuras do notebook
+    if pendentes:
+        max_workers = min(len(pendentes), num_processos or os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            list(executor.map(_renderizar_grafico, *zip(*pendentes)))
+
+    with open(caminho_cache, 'w', encoding='utf-8') as arquivo:
+        json.dump(cache, arquivo, indent=4)
+
+    return caminhos
+
+
+def obter_hash_grafico(funcao, argumentos, argumentos_nomeados=None, dpi=100):
+    """
+    Calcula o hash que identifica o conteúdo de um gráfico (código da função, dados e parâmetros).
+    
+    Parâmetros:
+        - funcao: Função que monta o gráfico.
+        - argumentos: Tupla com os argumentos da função.
+        - argumentos_nomeados: Dicionário com os argumentos nomeados da função.
+        - dpi: Resolução do arquivo exportado.
+    
+    Retorna:
+        - Hash SHA-256 em hexadecimal.
+    """
+    
+    resumo = hashlib.sha256(f'{funcao.__module__}.{funcao.__qualname__}:{dpi}'.encode())
+
+    # O código da função e das funções, classes e constantes de notebooks/include que ela usa, direta ou
+    # indiretamente (ex: montar_grafico_barra_vertical, HistogramaFixo), entra no hash, assim como as classes dos
+    # argumentos, para que mudanças no gráfico também o redesenhem
+    argumentos_nomeados = argumentos_nomeados or {}
+    classes_argumentos = [type(argumento) for argumento in [*argumentos, *argumentos_nomeados.values()]]
+    _atualizar_hash(resumo, _obter_codigos_dependencias(funcao, classes_argumentos))
+
+    _atualizar_hash(resumo, tuple(argumentos))
+    _atualizar_hash(resumo, argumentos_nomeados)
+
+    return resumo.hexdigest()
+
+
+def _obter_codigos_dependencias(funcao, classes=()):
+    """
+    Reúne o código-fonte de uma função e das funções e classes de notebooks/include que ela usa, seguindo os nomes
+    globais do código de cada uma até as suas próprias dependências. As constantes simples usadas (ex:
+    COLUNAS_VISUALIZACAO_INICIAL) entram pelo valor.
+    """
+
+    pasta_include = os.path.dirname(os.path.abspath(__file__))
+    codigos, vistos = {}, set()
+    pendentes = [(funcao, True)] + [(classe, False) for classe in classes]
+
+    while pendentes:
+        objeto, raiz = pendentes.pop()
+        if id(objeto) in vistos:
+            continue
+        vistos.add(id(objeto))
+
+        try:
+            arquivo = inspect.getsourcefile(objeto)
+            codigo = inspect.getsource(objeto)
+        except (OSError, TypeError):
+            arquivo = codigo = None
+
+        # Fora da função do gráfico, só o código de notebooks/include é seguido (não o das bibliotecas); a função do
+        # gráfico é seguida mesmo sem código-fonte disponível (ex: lambda definida fora de um arquivo)
+        if not raiz and (codigo is None or os.path.dirname(os.path.abspath(arquivo)) != pasta_include):
+            continue
+
+        if codigo is not None:
+            chave = f'{objeto.__module__}.{objeto.__qualname__}' if hasattr(objeto, '__qualname__') else arquivo
+            codigos[chave] = codigo
+        if inspect.ismodule(objeto):
+            continue
+
+        if inspect.isclass(objeto):
+            pendentes.extend((base, False) for base in objeto.__bases__)
+            membros = [getattr(membro, '__func__', getattr(membro, 'fget', membro)) for membro in vars(objeto).values()]
+            funcoes = [membro for membro in membros if inspect.isfunction(membro)]
+        else:
+            funcoes = [objeto] if inspect.isfunction(objeto) else []
+
+        for funcao_dependente in funcoes:
+            for nome in _obter_nomes_globais(funcao_dependente.__code__):
+                if nome not in funcao_dependente.__globals__:
+                    continue
+
+                valor = funcao_dependente.__globals__[nome]
+                if inspect.isfunction(valor) or inspect.isclass(valor) or inspect.ismodule(valor):
+                    pendentes.append((valor, False))
+                elif isinstance(valor, (set, frozenset)):
+                    codigos[f'{funcao_dependente.__module__}.{nome}'] = sorted(valor, key=repr)
+                elif isinstance(valor, (str, int, float, bool, tuple, list, dict)):
+                    codigos[f'{funcao_dependente.__module__}.{nome}'] = valor
+
+    return dict(sorted(codigos.items()))
+
+
+def _obter_nomes_globais(codigo):
+    """
+    Nomes usados por um objeto de código, incluindo os das funções internas, lambdas e compreensões.
+    """
+
+    nomes = set(codigo.co_names)
+    for constante in codigo.co_consts:
+        if inspect.iscode(constante):
+            nomes |= _obter_nomes_globais(constante)
+
+    return nomes
+
+
+def _atualizar_hash(resumo, valor):
+    """
+    Adiciona um valor ao hash, usando o hash por linha do pandas nos DataFrames e Series e os bytes nos arrays.
+    """
+    
+    if isinstance(valor, (pd.DataFrame, pd.Series)):
+        colunas = list(valor.columns) if isinstance(valor, pd.DataFrame) else [valor.name]
+        tipos = valor.dtypes.astype(str).tolist() if isinstance(valor, pd.DataFrame) else [str(valor.dtype)]
+        resumo.update(pickle.dumps((type(valor).__name__, colunas, tipos)))
+        resumo.update(pd.util.hash_pandas_object(valor, index=True).to_numpy().tobytes())
+    elif isinstance(valor, np.ndarray):
+        resumo.update(f'{valor.dtype}{valor.shape}'.encode())
+        resumo.update(np.ascontiguousarray(valor).tobytes())
+    elif isinstance(valor, (list, tuple)):
+        resumo.update(f'{type(valor).__name__}{len(valor)}'.encode())
+        for item in valor:
+            _atualizar_hash(resumo, item)
+    elif isinstance(valor, dict):
+        resumo.update(f'dict{len(valor)}'.encode())
+        for chave, item in valor.items():
+            _atualizar_hash(resumo, chave)
+            _atualizar_hash(resumo, item)
+    else:
+        resumo.update(pickle.dumps(valor))
+
+
+def _renderizar_grafico(funcao, argumentos, argumentos_nomeados, caminho, dpi):
+    """
+    Monta um gráfico com o backend Agg e salva a figura em arquivo.
+    """
+    
+    plt.switch_backend('Agg')
+
+    with warnings.catch_warnings():
+        # O plt.show() das funções não exibe nada no backend Agg
+        warnings.simplefilter('ignore', UserWarning)
+        funcao(*argumentos, **argumentos_nomeados)
+
+    plt.gcf().savefig(caminho, dpi=dpi, bbox_inches='tight')
+    plt.close('all')
+
+    return caminho
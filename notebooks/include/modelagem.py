@@ -0,0 +1,977 @@
+from concurrent.futures import ProcessPoolExecutor
+from functools import reduce
+import hashlib
+import numpy as np
+import os
+import pandas as pd
+from sklearn.base import BaseEstimator, RegressorMixin, clone
+from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+from sklearn.model_selection import KFold
+import tempfile
+import time
+
+from .utils import (ModuloSobDemanda, dividir_csv_em_intervalos, dividir_em_shards, executar_em_shards, ler_intervalo_csv,
+                    verificar_se_modelo_tem_dados_nan_inf)
+
+
+# Usados apenas nas buscas de hiperparâmetros (BayesSearchCV e Optuna)
+skopt = ModuloSobDemanda('skopt')
+optuna = ModuloSobDemanda('optuna')
+
+# Arquivo com os estudos do Optuna, retomados a cada execução
+CAMINHO_ESTUDOS_OPTUNA = "../modelos/estudos_optuna.log"
+
+# Parâmetros sorteados em um intervalo contínuo (entre o primeiro e o último valor do espaço) em vez de entre os valores
+PARAMETROS_CONTINUOS = {
+    'Ridge Regression': ['alpha']
+}
+
+# Semente do BayesSearchCV
+SEMENTE_BUSCA = 42
+
+# Mensagem da verificação de NaN e Inf quando o modelo passa
+SEM_NAN_INF = 'Sem NaN e Inf nas previsões do modelo'
+
+
+def salvar_arrays_memmap(arrays, pasta):
+    """
+    Grava arrays em arquivos .npy, para serem abertos como memmap (sem cópia) por vários processos.
+
+    Parâmetros:
+        - arrays: Dicionário nome: array
+        - pasta: Pasta dos arquivos
+
+    Retorna:
+        - Dicionário nome: caminho do arquivo
+    """
+
+    caminhos = {}
+    for nome, array in arrays.items():
+        caminhos[nome] = os.path.join(pasta, f'{nome}.npy')
+        np.save(caminhos[nome], np.ascontiguousarray(array))
+
+    return caminhos
+
+
+def carregar_arrays_memmap(caminhos):
+    """
+    Abre os arrays gravados com salvar_arrays_memmap, mapeados em memória e somente leitura.
+
+    Parâmetros:
+        - caminhos: Dicionário nome: caminho do arquivo
+
+    Retorna:
+        - Dicionário nome: np.memmap
+    """
+
+    return {nome: np.load(caminho, mmap_mode='r') for nome, caminho in caminhos.items()}
+
+
+def obter_folds(kfold, X):
+    """
+    Fixa os índices de treino e validação de cada fold.
+
+    Com shuffle=True e sem semente, cada chamada ao split sorteia folds diferentes; fixando os folds uma única vez,
+    todas as etapas (busca, seleção, verificação de overfitting) avaliam os modelos nos mesmos folds e podem
+    reaproveitar os resultados do CacheAvaliacoes.
+
+    Parâmetros:
+        - kfold: Divisão da validação cruzada (ex: KFold(n_splits=5, shuffle=True))
+        - X: Dados de treino
+
+    Retorna:
+        - Lista de tuplas (indices_treino, indices_validacao)
+    """
+
+    return [(treino, validacao) for treino, validacao in kfold.split(X)]
+
+
+def obter_chave_modelo(modelo):
+    """
+    Identifica um modelo pela classe e pelos hiperparâmetros.
+
+    Parâmetros:
+        - modelo: Modelo do scikit-learn
+
+    Retorna:
+        - Tupla (classe, parâmetros) que pode ser usada como chave de dicionário
+    """
+
+    # Escalares do NumPy (ex: sugeridos pelo BayesSearchCV) geram a mesma chave que os valores do Python
+    parametros = sorted((parametro, valor.item() if isinstance(valor, np.generic) else valor)
+                        for parametro, valor in modelo.get_params(deep=False).items())
+
+    return f'{type(modelo).__module__}.{type(modelo).__qualname__}', repr(parametros)
+
+
+class CacheAvaliacoes:
+    """
+    Resultados da validação cruzada por fold (previsões, R2 e MSE), chaveados por (modelo, parâmetros, índices do fold).
+
+    Cada combinação de modelo, parâmetros e fold é ajustada uma única vez; as etapas seguintes (seleção do melhor
+    modelo, verificação de overfitting e relatórios) leem os resultados já calculados. Um cache vale para um único
+    conjunto de treino: se os dados mudarem, crie um novo.
+    """
+
+    def __init__(self):
+        self.folds = {}
+
+    def avaliar_fold(self, modelo, X, y, treino, validacao):
+        """
+        Ajusta o modelo no treino do fold e avalia na validação, ou lê o resultado do cache.
+
+        Parâmetros:
+            - modelo: Modelo do scikit-learn (não é alterado; o ajuste é feito em um clone)
+            - X, y: Dados de treino
+            - treino, validacao: Índices do fold
+
+        Retorna:
+            - Dicionário com as previsões da validação, o R2 e o MSE do fold
+        """
+
+        chave = self._obter_chave(modelo, treino, validacao)
+
+        if chave not in self.folds:
+            previsoes = clone(modelo).fit(X[treino], y[treino]).predict(X[validacao])
+            self._registrar(chave, previsoes, y[validacao])
+
+        return self.folds[chave]
+
+    def avaliar_fold_estimadores(self, modelo, valores_estimadores, X, y, treino, validacao):
+        """
+        Avalia um ensemble (ex: RandomForestRegressor, GradientBoostingRegressor) com várias quantidades de
+        estimadores em um fold, treinando um único ensemble que cresce de um valor para o seguinte (warm_start).
+
+        Avaliar 100, 200 e 300 estimadores custa um único ajuste com 300. Com random_state fixo, os estimadores são
+        os mesmos de um ajuste do zero, e cada resultado é guardado com a chave do modelo sem warm_start.
+
+        Parâmetros:
+            - modelo: Modelo com os parâmetros n_estimators e warm_start (não é alterado)
+            - valores_estimadores: Quantidades de estimadores avaliadas
+            - X, y: Dados de treino
+            - treino, validacao: Índices do fold
+
+        Retorna:
+            - Dicionário n_estimators: resultado do fold (ver avaliar_fold)
+        """
+
+        modelos = {n: clone(modelo).set_params(n_estimators=n) for n in sorted(set(valores_estimadores))}
+        pendentes = [n for n, candidato in modelos.items() if self._obter_chave(candidato, treino, validacao) not in self.folds]
+
+        if pendentes:
+            ensemble = clone(modelo).set_params(warm_start=True)
+            for n in [n for n in modelos if n <= max(pendentes)]:
+                ensemble.set_params(n_estimators=n).fit(X[treino], y[treino])
+                self._registrar(self._obter_chave(modelos[n], treino, validacao), ensemble.predict(X[validacao]),
+                                y[validacao])
+
+        return {n: self.folds[self._obter_chave(candidato, treino, validacao)] for n, candidato in modelos.items()}
+
+    def validacao_cruzada(self, modelo, X, y, folds):
+        """
+        Validação cruzada com os resultados do cache (equivalente ao cross_val_score nos mesmos folds).
+
+        Parâmetros:
+            - modelo: Modelo do scikit-learn
+            - X, y: Dados de treino
+            - folds: Lista de tuplas (indices_treino, indices_validacao), ver obter_folds
+
+        Retorna:
+            - Dicionário com o R2 e o MSE de cada fold e as previsões fora do fold de cada linha (NaN nas linhas que
+              não estão em nenhuma validação ou cujo fold foi lido de uma busca, ver registrar_busca)
+        """
+
+        avaliacoes = [self.avaliar_fold(modelo, X, y, treino, validacao) for treino, validacao in folds]
+
+        previsoes = np.full(len(y), np.nan)
+        for (_, validacao), avaliacao in zip(folds, avaliacoes):
+            if avaliacao['previsoes'] is not None:
+                previsoes[validacao] = avaliacao['previsoes']
+
+        return {
+            'r2': np.array([avaliacao['r2'] for avaliacao in avaliacoes]),
+            'mse': np.array([avaliacao['mse'] for avaliacao in avaliacoes]),
+            'previsoes': previsoes
+        }
+
+    def validacao_cruzada_estimadores(self, modelo, valores_estimadores, X, y, folds):
+        """
+        Validação cruzada de um ensemble com várias quantidades de estimadores, com warm_start em cada fold (ver
+        avaliar_fold_estimadores).
+
+        Parâmetros:
+            - modelo: Modelo com os parâmetros n_estimators e warm_start
+            - valores_estimadores: Quantidades de estimadores avaliadas
+            - X, y: Dados de treino
+            - folds: Lista de tuplas (indices_treino, indices_validacao), ver obter_folds
+
+        Retorna:
+            - Dicionário n_estimators: resultado da validação cruzada (ver validacao_cruzada)
+        """
+
+        for treino, validacao in folds:
+            self.avaliar_fold_estimadores(modelo, valores_estimadores, X, y, treino, validacao)
+
+        return {n: self.validacao_cruzada(clone(modelo).set_params(n_estimators=n), X, y, folds)
+                for n in sorted(set(valores_estimadores))}
+
+    def registrar_busca(self, busca, y, folds):
+        """
+        Guarda os resultados por fold do melhor candidato de uma busca já ajustada nos mesmos folds (ex: BayesSearchCV
+        com cv=folds), sem ajustar o modelo novamente.
+
+        O MSE de cada fold vem do cv_results_ da busca e o R2 é calculado a partir dele (1 - MSE / variância do alvo
+        no fold). As previsões da busca não ficam disponíveis.
+
+        Parâmetros:
+            - busca: Busca ajustada com scoring='neg_mean_squared_error' e cv=folds
+            - y: Alvo dos dados de treino
+            - folds: Lista de tuplas (indices_treino, indices_validacao), os mesmos da busca
+
+        Retorna:
+            - O próprio cache
+        """
+
+        for indice, (treino, validacao) in enumerate(folds):
+            chave = self._obter_chave(busca.best_estimator_, treino, validacao)
+
+            if chave not in self.folds:
+                mse = -busca.cv_results_[f'split{indice}_test_score'][busca.best_index_]
+                self.folds[chave] = {'previsoes': None, 'r2': 1 - mse / np.var(y[validacao]), 'mse': mse}
+
+        return self
+
+    def combinar(self, outro):
+        """
+        Junta os resultados de outro cache (ex: o de um processo de avaliar_modelos).
+
+        Parâmetros:
+            - outro: CacheAvaliacoes
+
+        Retorna:
+            - O próprio cache
+        """
+
+        self.folds.update(outro.folds)
+
+        return self
+
+    def __len__(self):
+        return len(self.folds)
+
+    def _obter_chave(self, modelo, treino, validacao):
+        return obter_chave_modelo(modelo), _obter_chave_indices(treino), _obter_chave_indices(validacao)
+
+    def _registrar(self, chave, previsoes, y_validacao):
+        self.folds[chave] = {
+            'previsoes': previsoes,
+            'r2': r2_score(y_validacao, previsoes),
+            'mse': mean_squared_error(y_validacao, previsoes)
+        }
+
+
+def aceita_warm_start(modelo):
+    """
+    Verifica se o modelo é um ensemble que pode crescer com warm_start (ex: RandomForestRegressor,
+    GradientBoostingRegressor).
+
+    Parâmetros:
+        - modelo: Modelo do scikit-learn
+
+    Retorna:
+        - True se o modelo tem os parâmetros n_estimators e warm_start
+    """
+
+    return {'n_estimators', 'warm_start'} <= set(modelo.get_params(deep=False))
+
+
+def avaliar_candidatos(modelo, candidatos, X, y, folds, cache=None):
+    """
+    Avalia uma lista de candidatos de hiperparâmetros com validação cruzada.
+
+    Candidatos que só diferem em n_estimators são agrupados e avaliados com um único ensemble crescendo com
+    warm_start em cada fold, quando o modelo aceita (ver aceita_warm_start).
+
+    Parâmetros:
+        - modelo: Modelo do scikit-learn
+        - candidatos: Lista de dicionários de hiperparâmetros (ex: list(ParameterGrid(param_spaces[nome])))
+        - X, y: Dados de treino
+        - folds: Lista de tuplas (indices_treino, indices_validacao), ver obter_folds
+        - cache: CacheAvaliacoes (opcional)
+
+    Retorna:
+        - DataFrame com uma linha por candidato, na ordem da lista, com a média do R2 e do MSE nos folds
+    """
+
+    cache = CacheAvaliacoes() if cache is None else cache
+    resultados = [None] * len(candidatos)
+
+    # Agrupa os candidatos pelos demais hiperparâmetros
+    grupos = {}
+    for posicao, candidato in enumerate(candidatos):
+        demais = {parametro: valor for parametro, valor in candidato.items() if parametro != 'n_estimators'}
+        grupos.setdefault(repr(sorted(demais.items())), (demais, []))[1].append(posicao)
+
+    for demais, posicoes in grupos.values():
+        base = clone(modelo).set_params(**demais)
+        estimadores = [candidatos[posicao]['n_estimators'] for posicao in posicoes if 'n_estimators' in candidatos[posicao]]
+
+        if aceita_warm_start(base) and len(estimadores) == len(posicoes):
+            validacoes = cache.validacao_cruzada_estimadores(base, estimadores, X, y, folds)
+            for posicao in posicoes:
+                resultados[posicao] = validacoes[candidatos[posicao]['n_estimators']]
+        else:
+            for posicao in posicoes:
+                resultados[posicao] = cache.validacao_cruzada(clone(modelo).set_params(**candidatos[posicao]), X, y, folds)
+
+    return pd.DataFrame({
+        'Parâmetros': candidatos,
+        'R2 médio': [resultado['r2'].mean() for resultado in resultados],
+        'MSE médio': [resultado['mse'].mean() for resultado in resultados]
+    })
+
+
+def avaliar_modelos(models, param_spaces, X_train_scaled, y_train, X_test_scaled, y_test, kfold=None, n_iter=3,
+                    num_processos=None, folds=None, cache=None, busca='bayes', recurso='n_samples'):
+    """
+    Treina e avalia vários modelos em paralelo, cada modelo em um processo: verificação de NaN e Inf, busca de
+    hiperparâmetros (quando o modelo tem espaço de parâmetros, ver criar_busca), ajuste, métricas no teste e
+    validação cruzada.
+
+    Os dados de treino e teste são gravados uma única vez em arquivos temporários e abertos como memmap pelos
+    processos, em vez de serem copiados (pickle) para cada um.
+
+    Parâmetros:
+        - models: Dicionário nome: modelo do scikit-learn (os modelos do dicionário não são alterados)
+        - param_spaces: Dicionário nome: espaço de parâmetros do BayesSearchCV
+        - X_train_scaled, y_train: Dados de treino
+        - X_test_scaled, y_test: Dados de teste
+        - kfold: Divisão da validação cruzada (padrão é KFold(n_splits=5, shuffle=True))
+        - n_iter: Quantidade de iterações do BayesSearchCV
+        - num_processos: Quantidade de processos (padrão é o número de CPUs)
+        - folds: Folds fixos usados na busca e na validação cruzada (padrão é obter_folds(kfold, X_train_scaled))
+        - cache: CacheAvaliacoes que recebe os resultados por fold de cada processo (opcional)
+        - busca: 'bayes' (BayesSearchCV) ou 'halving' (successive halving), ver criar_busca
+        - recurso: Recurso aumentado a cada rodada do successive halving, ver criar_busca
+
+    Retorna:
+        - Tupla (resultados, modelos_ajustados): DataFrame com uma linha por modelo, na ordem de models, e
+          dicionário nome: modelo ajustado com os melhores parâmetros
+    """
+
+    kfold = KFold(n_splits=5, shuffle=True) if kfold is None else kfold
+    folds = obter_folds(kfold, X_train_scaled) if folds is None else folds
+    arrays = {'X_train': X_train_scaled, 'y_train': y_train, 'X_test': X_test_scaled, 'y_test': y_test}
+
+    with tempfile.TemporaryDirectory() as pasta:
+        caminhos = salvar_arrays_memmap(arrays, pasta)
+        argumentos = [(nome, modelo, param_spaces.get(nome), caminhos, folds, n_iter, busca, recurso)
+                      for nome, modelo in models.items()]
+
+        max_workers = min(len(argumentos), num_processos or os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            avaliacoes = list(executor.map(_avaliar_modelo, *zip(*argumentos)))
+
+    resultados = pd.DataFrame([resultado for resultado, _, _ in avaliacoes], index=list(models)).rename_axis('Modelo')
+    modelos_ajustados = {nome: modelo for nome, (_, modelo, _) in zip(models, avaliacoes)}
+
+    if cache is not None:
+        for _, _, cache_processo in avaliacoes:
+            cache.combinar(cache_processo)
+
+    return resultados, modelos_ajustados
+
+
+def criar_busca(modelo, espaco_parametros, folds, n_iter=3, busca='bayes', recurso='n_samples', fator=3, n_candidatos=None,
+                cache=None):
+    """
+    Cria a busca de hiperparâmetros de um modelo, pontuada com neg_mean_squared_error.
+
+    - 'bayes': BayesSearchCV com n_iter candidatos, todos avaliados com os dados completos nos folds fixos. O
+      BayesSearchCV sugere um candidato por vez, então os candidatos não são agrupados por n_estimators.
+    - 'halving': successive halving (BuscaHalving). Muitos candidatos são triados com pouco recurso (poucas linhas ou
+      poucos estimadores) e só os n_iter melhores são avaliados com o recurso completo nos folds fixos. Nos ensembles,
+      os candidatos que só diferem em n_estimators são avaliados juntos com warm_start (ver avaliar_candidatos).
+
+    Parâmetros:
+        - modelo: Modelo do scikit-learn (a busca usa um clone)
+        - espaco_parametros: Espaço de parâmetros, no mesmo formato do param_spaces
+        - folds: Lista de tuplas (indices_treino, indices_validacao), ver obter_folds
+        - n_iter: Quantidade de iterações do BayesSearchCV, ou de candidatos na última rodada do successive halving
+        - busca: 'bayes' ou 'halving'
+        - recurso: Recurso do successive halving, ver BuscaHalving
+        - fator: Fator de redução de candidatos e aumento de recurso a cada rodada do successive halving
+        - n_candidatos: Quantidade de candidatos da primeira rodada do successive halving, ver BuscaHalving
+        - cache: CacheAvaliacoes usado nas rodadas com todas as linhas do successive halving (opcional)
+
+    Retorna:
+        - Busca ainda não ajustada, com a mesma interface do GridSearchCV (fit, best_estimator_, best_params_)
+    """
+
+    # neg_mean_squared_error mede a diferença entre valores previstos e valores reais em modelos de regressão
+    if busca == 'bayes':
+        return skopt.BayesSearchCV(clone(modelo), espaco_parametros, cv=folds, scoring='neg_mean_squared_error',
+                                   n_iter=n_iter, random_state=SEMENTE_BUSCA)
+
+    if busca != 'halving':
+        raise ValueError(f"Busca '{busca}' não suportada, use 'bayes' ou 'halving'")
+
+    return BuscaHalving(modelo, espaco_parametros, folds, n_iter, recurso, fator, n_candidatos, cache)
+
+
+class BuscaHalving:
+    """
+    Successive halving com a última rodada sempre no recurso completo (todas as linhas ou o maior n_estimators).
+
+    Muitos candidatos são avaliados com pouco recurso e só a melhor fração (1/fator) de cada rodada passa para a
+    seguinte, com fator vezes mais recurso. Os n_iter melhores candidatos da última triagem são avaliados com o
+    recurso completo nos folds fixos, como no BayesSearchCV (e pelo CacheAvaliacoes, então a validação cruzada do
+    melhor modelo não é refeita), e o melhor é ajustado com todos os dados.
+
+    Todas as rodadas usam avaliar_candidatos: com recurso='n_samples' e um ensemble que aceita warm_start, cada
+    combinação sorteada dos demais hiperparâmetros é avaliada com todos os valores de n_estimators do espaço, pelo
+    custo de um único ajuste com o maior valor em cada fold.
+
+    Parâmetros:
+        - modelo: Modelo do scikit-learn (a busca usa clones)
+        - espaco_parametros: Espaço de parâmetros, no mesmo formato do param_spaces
+        - folds: Lista de tuplas (indices_treino, indices_validacao), ver obter_folds
+        - n_iter: Quantidade de candidatos avaliados com o recurso completo
+        - recurso: 'n_samples' (amostras de linhas) ou 'n_estimators' (quantidade de estimadores, entre o menor e o
+          maior valor do espaço; modelos sem n_estimators no espaço usam 'n_samples')
+        - fator: Fator de redução de candidatos e aumento de recurso a cada rodada
+        - n_candidatos: Quantidade de candidatos da primeira rodada (padrão é n_iter vezes fator elevado ao número de
+          rodadas menos um; 3 rodadas com amostras de linhas)
+        - cache: CacheAvaliacoes usado nas rodadas com todas as linhas (padrão é um cache novo)
+    """
+
+    def __init__(self, modelo, espaco_parametros, folds, n_iter=3, recurso='n_samples', fator=3, n_candidatos=None,
+                 cache=None):
+        self.modelo = modelo
+        self.espaco_parametros = espaco_parametros
+        self.folds = folds
+        self.n_iter = n_iter
+        self.recurso = recurso
+        self.fator = fator
+        self.n_candidatos = n_candidatos
+        self.cache = CacheAvaliacoes() if cache is None else cache
+
+    def fit(self, X, y):
+        """
+        Executa as rodadas de triagem e a rodada final com o recurso completo.
+
+        Parâmetros:
+            - X, y: Dados de treino (os mesmos dos folds)
+
+        Retorna:
+            - A própria busca, com best_params_, best_score_, best_estimator_ e a quantidade de recurso
+              (n_resources_) e de candidatos (n_candidates_) de cada rodada
+        """
+
+        from sklearn.model_selection import ParameterSampler
+
+        espaco_parametros = dict(self.espaco_parametros)
+        if self.recurso == 'n_estimators' and 'n_estimators' in espaco_parametros:
+            estimadores = espaco_parametros.pop('n_estimators')
+            maximo, completo = max(estimadores), {'n_estimators': max(estimadores)}
+            rodadas = 1 + int(np.log(maximo / min(estimadores)) / np.log(self.fator) + 1e-9)
+            minimo_triagem = 1
+        else:
+            maximo, completo, rodadas = len(y), {}, 3
+            minimo_triagem = 2 * len(self.folds)
+
+        n_candidatos = self.n_iter * self.fator ** (rodadas - 1) if self.n_candidatos is None else self.n_candidatos
+        minimo = maximo // self.fator ** (rodadas - 1)
+
+        # Com amostras de linhas, os valores de n_estimators saem do sorteio e cada candidato é avaliado com todos
+        # eles de uma vez (warm_start)
+        valores_estimadores = [None]
+        if not completo and 'n_estimators' in espaco_parametros and aceita_warm_start(self.modelo):
+            valores_estimadores = sorted(set(espaco_parametros.pop('n_estimators')))
+
+        def expandir(sorteados):
+            return [{**parametros, **({} if n is None else {'n_estimators': n})}
+                    for parametros in sorteados for n in valores_estimadores]
+
+        self.n_resources_, self.n_candidates_ = [], []
+        if rodadas > 1 and minimo >= minimo_triagem:
+            quantidade = int(np.ceil(n_candidatos / len(valores_estimadores)))
+            candidatos = expandir(ParameterSampler(espaco_parametros, quantidade, random_state=SEMENTE_BUSCA))
+            gerador = np.random.default_rng(SEMENTE_BUSCA)
+
+            # A triagem vai até uma rodada antes do recurso completo
+            for rodada in range(rodadas - 1):
+                recurso_rodada = minimo * self.fator ** rodada
+
+                if completo:
+                    avaliacoes = avaliar_candidatos(self.modelo, [{**parametros, 'n_estimators': recurso_rodada}
+                                                                  for parametros in candidatos],
+                                                    X, y, self.folds, self.cache)
+                else:
+                    # Os folds são refeitos sobre as linhas sorteadas, com um cache próprio (os índices dos folds
+                    # se referem à amostra, não aos dados de treino)
+                    linhas = np.sort(gerador.choice(len(y), recurso_rodada, replace=False))
+                    X_rodada, y_rodada = X[linhas], y[linhas]
+                    folds_rodada = obter_folds(KFold(n_splits=len(self.folds), shuffle=True,
+                                                     random_state=SEMENTE_BUSCA), X_rodada)
+                    avaliacoes = avaliar_candidatos(self.modelo, candidatos, X_rodada, y_rodada, folds_rodada)
+
+                self.n_resources_.append(recurso_rodada)
+                self.n_candidates_.append(len(candidatos))
+
+                restantes = max(self.n_iter, int(np.ceil(len(candidatos) / self.fator)))
+                ordem = np.argsort(avaliacoes['MSE médio'].to_numpy(), kind='stable')
+                candidatos = [candidatos[posicao] for posicao in ordem[:restantes]]
+
+            finalistas = candidatos[:self.n_iter]
+        else:
+            # Recurso pequeno demais para triar: os candidatos vão direto para a rodada final
+            quantidade = int(np.ceil(self.n_iter / len(valores_estimadores)))
+            finalistas = expandir(ParameterSampler(espaco_parametros, quantidade, random_state=SEMENTE_BUSCA))
+
+        # Finalistas que só diferem em n_estimators também são agrupados na rodada final
+        finalistas = [{**parametros, **completo} for parametros in finalistas]
+        avaliacoes = avaliar_candidatos(self.modelo, finalistas, X, y, self.folds, self.cache)
+        melhor = int(np.argmin(avaliacoes['MSE médio'].to_numpy()))
+
+        self.best_params_ = finalistas[melhor]
+        self.best_score_ = -avaliacoes['MSE médio'].iloc[melhor]
+        self.best_estimator_ = clone(self.modelo).set_params(**self.best_params_).fit(X, y)
+        self.n_resources_.append(maximo)
+        self.n_candidates_.append(len(finalistas))
+
+        return self
+
+
+def _avaliar_modelo(nome, modelo, espaco_parametros, caminhos, folds, n_iter, busca, recurso):
+    """
+    Avalia um modelo com os arrays mapeados em memória (ver avaliar_modelos).
+    """
+
+    inicio = time.perf_counter()
+    arrays = carregar_arrays_memmap(caminhos)
+    X_train, y_train, X_test, y_test = arrays['X_train'], arrays['y_train'], arrays['X_test'], arrays['y_test']
+    cache = CacheAvaliacoes()
+
+    melhores_parametros = None
+    if espaco_parametros:
+        # O melhor modelo já é ajustado com todos os dados de treino pela busca (refit)
+        buscador = criar_busca(modelo, espaco_parametros, folds, n_iter, busca, recurso, cache=cache)
+        buscador.fit(X_train, y_train)
+        modelo, melhores_parametros = buscador.best_estimator_, dict(buscador.best_params_)
+
+        # O successive halving já avalia os finalistas pelo cache; os folds do BayesSearchCV são lidos do cv_results_
+        if busca == 'bayes':
+            cache.registrar_busca(buscador, y_train, folds)
+    else:
+        modelo = clone(modelo).fit(X_train, y_train)
+
+    # A verificação usa o próprio ajuste final, sem treinar o modelo mais uma vez
+    try:
+        verificar_se_modelo_tem_dados_nan_inf(modelo, X_train, y_train, ajustar=False)
+        verificacao = SEM_NAN_INF
+    except ValueError as e:
+        verificacao = f"{nome}: {e}"
+
+    y_pred = modelo.predict(X_test)
+
+    # Acurácia média (R2) usando validação cruzada; os folds já avaliados pela busca são lidos do cache
+    validacao = cache.validacao_cruzada(modelo, X_train, y_train, folds)
+
+    resultado = {
+        'Verificação NaN/Inf': verificacao,
+        'Melhores parâmetros': melhores_parametros,
+        'MSE': mean_squared_error(y_test, y_pred),
+        'MAE': mean_absolute_error(y_test, y_pred),
+        'R2': r2_score(y_test, y_pred),
+        'Acurácia média (validação cruzada)': validacao['r2'].mean(),
+        'MSE médio (validação cruzada)': validacao['mse'].mean(),
+        'Tempo (s)': time.perf_counter() - inicio
+    }
+
+    return resultado, modelo, cache
+
+
+def _obter_chave_indices(indices):
+    """
+    Resume os índices de um fold em uma chave curta.
+    """
+
+    indices = np.asarray(indices)
+
+    return len(indices), hashlib.sha1(np.ascontiguousarray(indices, dtype='int64').tobytes()).hexdigest()
+
+
+def criar_modelo_optuna(trial, nome_modelo, models, param_spaces):
+    """
+    Cria um modelo com os hiperparâmetros sugeridos pelo Optuna a partir do espaço de parâmetros do modelo.
+
+    Parâmetros:
+        - trial: Tentativa do Optuna
+        - nome_modelo: Nome do modelo em models e param_spaces
+        - models: Dicionário nome: modelo do scikit-learn
+        - param_spaces: Dicionário nome: espaço de parâmetros (modelos sem espaço usam os hiperparâmetros padrão)
+
+    Retorna:
+        - Novo modelo (clone) com os hiperparâmetros sugeridos
+    """
+
+    parametros = {}
+    for parametro, valores in param_spaces.get(nome_modelo, {}).items():
+        if parametro in PARAMETROS_CONTINUOS.get(nome_modelo, []):
+            parametros[parametro] = trial.suggest_float(parametro, valores[0], valores[-1])
+        else:
+            parametros[parametro] = trial.suggest_categorical(parametro, valores)
+
+    return clone(models[nome_modelo]).set_params(**parametros)
+
+
+def objetivo_optuna(trial, nome_modelo, models, param_spaces, X, y, folds, cache):
+    """
+    Função objetivo do Optuna: média do neg_mean_squared_error na validação cruzada.
+
+    O score parcial é informado a cada fold, para que o pruner interrompa as tentativas que já estão piores que as
+    anteriores nos primeiros folds. Os folds já avaliados com os mesmos parâmetros são lidos do cache, e nos ensembles
+    as quantidades de estimadores do espaço até a da tentativa são avaliadas juntas, um fold por vez (ver
+    CacheAvaliacoes.avaliar_fold_estimadores).
+
+    Parâmetros:
+        - trial: Tentativa do Optuna
+        - nome_modelo, models, param_spaces: ver criar_modelo_optuna
+        - X, y: Dados de treino
+        - folds: Lista de tuplas (indices_treino, indices_validacao), ver obter_folds
+        - cache: CacheAvaliacoes
+
+    Retorna:
+        - Média do neg_mean_squared_error nos folds
+    """
+
+    modelo = criar_modelo_optuna(trial, nome_modelo, models, param_spaces)
+
+    # Nos ensembles, o ensemble de cada fold cresce (warm_start) só até o n_estimators da tentativa, registrando as
+    # quantidades menores do espaço no caminho; as próximas tentativas com os mesmos demais parâmetros e até esse
+    # n_estimators são lidas do cache, e uma tentativa interrompida pelo pruner não paga o ensemble maior
+    valores_estimadores = None
+    if aceita_warm_start(modelo) and 'n_estimators' not in PARAMETROS_CONTINUOS.get(nome_modelo, []):
+        valores_estimadores = [n for n in param_spaces.get(nome_modelo, {}).get('n_estimators', [])
+                               if n <= modelo.n_estimators]
+
+    scores = []
+    for passo, (treino, validacao) in enumerate(folds):
+        if valores_estimadores:
+            cache.avaliar_fold_estimadores(modelo, valores_estimadores, X, y, treino, validacao)
+
+        scores.append(-cache.avaliar_fold(modelo, X, y, treino, validacao)['mse'])
+
+        trial.report(np.mean(scores), passo)
+        if trial.should_prune():
+            raise optuna.TrialPruned()
+
+    return np.mean(scores)
+
+
+def carregar_estudo_optuna(nome_estudo, caminho=CAMINHO_ESTUDOS_OPTUNA, pruner=None):
+    """
+    Cria ou retoma um estudo do Optuna gravado em arquivo (JournalFileBackend, que aceita vários processos).
+
+    Parâmetros:
+        - nome_estudo: Nome do estudo no arquivo
+        - caminho: Arquivo dos estudos (padrão é CAMINHO_ESTUDOS_OPTUNA)
+        - pruner: Pruner do estudo (padrão é o MedianPruner, a partir do segundo fold)
+
+    Retorna:
+        - optuna.Study com as tentativas já gravadas
+    """
+
+    os.makedirs(os.path.dirname(caminho) or '.', exist_ok=True)
+    armazenamento = optuna.storages.JournalStorage(optuna.storages.journal.JournalFileBackend(caminho))
+    pruner = optuna.pruners.MedianPruner(n_warmup_steps=1) if pruner is None else pruner
+
+    return optuna.create_study(study_name=nome_estudo, storage=armazenamento, direction='maximize', pruner=pruner,
+                               load_if_exists=True)
+
+
+def otimizar_estudo_optuna(nome_modelo, models, param_spaces, X, y, folds, n_trials, nome_estudo=None,
+                           caminho=CAMINHO_ESTUDOS_OPTUNA, num_processos=1, pruner=None, cache=None):
+    """
+    Otimiza os hiperparâmetros de um modelo com um estudo do Optuna gravado em arquivo.
+
+    O estudo é retomado a cada execução: apenas as tentativas que faltam para completar n_trials são executadas.
+    Com mais de um processo, cada processo executa parte das tentativas no mesmo estudo, com os dados de treino
+    compartilhados por memmap.
+
+    Parâmetros:
+        - nome_modelo, models, param_spaces: ver criar_modelo_optuna
+        - X, y: Dados de treino
+        - folds: Lista de tuplas (indices_treino, indices_validacao), ver obter_folds
+        - n_trials: Quantidade total de tentativas concluídas (ou interrompidas pelo pruner) desejada no estudo
+        - nome_estudo: Nome do estudo no arquivo (padrão é o nome do modelo)
+        - caminho: Arquivo dos estudos (padrão é CAMINHO_ESTUDOS_OPTUNA)
+        - num_processos: Quantidade de processos
+        - pruner: Pruner do estudo (padrão é o MedianPruner, a partir do segundo fold)
+        - cache: CacheAvaliacoes que recebe os resultados por fold de cada tentativa (opcional)
+
+    Retorna:
+        - optuna.Study com todas as tentativas
+    """
+
+    nome_estudo = nome_modelo if nome_estudo is None else nome_estudo
+    estudo = carregar_estudo_optuna(nome_estudo, caminho, pruner)
+
+    finalizadas = [trial for trial in estudo.trials if trial.state.is_finished()]
+    restantes = max(n_trials - len(finalizadas), 0)
+    tentativas_por_processo = [quantidade for quantidade in dividir_em_shards(restantes, num_processos) if quantidade > 0]
+
+    if not tentativas_por_processo:
+        return estudo
+
+    with tempfile.TemporaryDirectory() as pasta:
+        caminhos = salvar_arrays_memmap({'X': X, 'y': y}, pasta)
+        argumentos = [(nome_estudo, caminho, pruner, nome_modelo, models, param_spaces, caminhos, folds, tentativas)
+                      for tentativas in tentativas_por_processo]
+        caches = executar_em_shards(_otimizar_em_processo, argumentos)
+
+    if cache is not None:
+        for cache_processo in caches:
+            cache.combinar(cache_processo)
+
+    return carregar_estudo_optuna(nome_estudo, caminho, pruner)
+
+
+def _otimizar_em_processo(nome_estudo, caminho, pruner, nome_modelo, models, param_spaces, caminhos, folds, n_trials):
+    """
+    Executa n_trials tentativas no estudo gravado em arquivo (ver otimizar_estudo_optuna).
+    """
+
+    arrays = carregar_arrays_memmap(caminhos)
+    estudo = carregar_estudo_optuna(nome_estudo, caminho, pruner)
+    cache = CacheAvaliacoes()
+
+    estudo.optimize(lambda trial: objetivo_optuna(trial, nome_modelo, models, param_spaces, arrays['X'], arrays['y'],
+                                                  folds, cache),
+                    n_trials=n_trials)
+
+    return cache
+
+
+class RegressaoLinearIncremental(BaseEstimator, RegressorMixin):
+    """
+    Regressão linear (ou Ridge, com alpha > 0) ajustada bloco a bloco, sem manter os dados em memória.
+
+    Cada bloco atualiza as médias e os produtos cruzados centrados de X e y (XᵀX e Xᵀy), combinados como em
+    EstatisticasOnline (Chan et al.), e os coeficientes vêm da solução das equações normais, resolvidas uma única vez
+    no primeiro acesso a coef_, intercept_ ou predict depois dos últimos blocos. O resultado é o mesmo
+    do LinearRegression / Ridge ajustados com todas as linhas, e dois modelos ajustados em partes diferentes dos
+    dados podem ser combinados, o que permite ajustar shards em paralelo.
+
+    Parâmetros:
+        - alpha: Penalidade Ridge (padrão é 0, regressão linear sem penalidade); o intercepto não é penalizado
+        - fit_intercept: Ajusta o intercepto (padrão é True)
+    """
+
+    def __init__(self, alpha=0.0, fit_intercept=True):
+        self.alpha = alpha
+        self.fit_intercept = fit_intercept
+
+    def fit(self, X, y):
+        """
+        Ajusta o modelo do zero com um único bloco.
+
+        Parâmetros:
+            - X: Array com as features
+            - y: Array com o alvo
+
+        Retorna:
+            - O próprio modelo ajustado
+        """
+
+        for atributo in ['n_amostras_', 'media_x_', 'media_y_', 'xtx_', 'xty_', 'n_features_in_', '_solucao']:
+            self.__dict__.pop(atributo, None)
+
+        return self.partial_fit(X, y)
+
+    def partial_fit(self, X, y):
+        """
+        Acumula um bloco de dados (os coeficientes só são recalculados quando forem usados). Linhas com NaN ou Inf
+        são ignoradas.
+
+        Parâmetros:
+            - X: Array com as features
+            - y: Array com o alvo
+
+        Retorna:
+            - O próprio modelo ajustado
+        """
+
+        X = np.asarray(X, dtype='float64')
+        y = np.asarray(y, dtype='float64').ravel()
+
+        validas = np.isfinite(X).all(axis=1) & np.isfinite(y)
+        X, y = X[validas], y[validas]
+
+        n_amostras = len(y)
+        media_x = X.mean(axis=0) if n_amostras else np.zeros(X.shape[1])
+        media_y = y.mean() if n_amostras else 0.0
+
+        X_centrado = X - media_x
+        y_centrado = y - media_y
+
+        return self._combinar_momentos(n_amostras, media_x, media_y, X_centrado.T @ X_centrado, X_centrado.T @ y_centrado)
+
+    def combinar(self, outro):
+        """
+        Combina com outro modelo ajustado nas mesmas features, como se os dois tivessem recebido todos os blocos.
+
+        Parâmetros:
+            - outro: RegressaoLinearIncremental ajustada em outra parte dos dados
+
+        Retorna:
+            - O próprio modelo ajustado
+        """
+
+        if not hasattr(outro, 'n_amostras_'):
+            return self
+
+        if hasattr(self, 'n_amostras_') and len(self.media_x_) != len(outro.media_x_):
+            raise ValueError("Só é possível combinar modelos ajustados nas mesmas features")
+
+        return self._combinar_momentos(outro.n_amostras_, outro.media_x_, outro.media_y_, outro.xtx_, outro.xty_)
+
+    def predict(self, X):
+        """
+        Prevê o alvo com os coeficientes ajustados.
+
+        Parâmetros:
+            - X: Array com as features
+
+        Retorna:
+            - Array com as previsões
+        """
+
+        return np.asarray(X, dtype='float64') @ self.coef_ + self.intercept_
+
+    @property
+    def coef_(self):
+        """
+        Coeficientes de cada feature.
+        """
+
+        return self._obter_solucao()[0]
+
+    @property
+    def intercept_(self):
+        """
+        Intercepto (0 quando fit_intercept=False).
+        """
+
+        return self._obter_solucao()[1]
+
+    def _combinar_momentos(self, n_amostras, media_x, media_y, xtx, xty):
+        """
+        Junta contagem, médias e produtos cruzados centrados de outro conjunto de dados aos acumulados e marca a
+        solução das equações normais como desatualizada.
+        """
+
+        if not hasattr(self, 'n_amostras_'):
+            self.n_amostras_, self.media_x_, self.media_y_, self.xtx_, self.xty_ = n_amostras, media_x, media_y, xtx, xty
+        elif n_amostras:
+            total = self.n_amostras_ + n_amostras
+            delta_x = media_x - self.media_x_
+            delta_y = media_y - self.media_y_
+            peso = self.n_amostras_ * n_amostras / total
+
+            self.xtx_ = self.xtx_ + xtx + peso * np.outer(delta_x, delta_x)
+            self.xty_ = self.xty_ + xty + peso * delta_x * delta_y
+            self.media_x_ = self.media_x_ + delta_x * n_amostras / total
+            self.media_y_ = self.media_y_ + delta_y * n_amostras / total
+            self.n_amostras_ = total
+
+        self.n_features_in_ = len(self.media_x_)
+        self._solucao = None
+
+        return self
+
+    def _obter_solucao(self):
+        """
+        Resolve as equações normais (XᵀX + alpha * I) w = Xᵀy, se algum bloco foi acumulado desde a última solução.
+        """
+
+        if getattr(self, '_solucao', None) is not None:
+            return self._solucao
+
+        if self.fit_intercept:
+            xtx, xty = self.xtx_, self.xty_
+        else:
+            # Sem intercepto, os produtos cruzados são em relação à origem, e não à média
+            xtx = self.xtx_ + self.n_amostras_ * np.outer(self.media_x_, self.media_x_)
+            xty = self.xty_ + self.n_amostras_ * self.media_x_ * self.media_y_
+
+        matriz = xtx + self.alpha * np.eye(len(xty))
+
+        try:
+            coeficientes = np.linalg.solve(matriz, xty)
+        except np.linalg.LinAlgError:
+            # Features colineares (ou poucas linhas): solução de mínimos quadrados de menor norma
+            coeficientes = np.linalg.lstsq(matriz, xty, rcond=None)[0]
+
+        intercepto = self.media_y_ - self.media_x_ @ coeficientes if self.fit_intercept else 0.0
+        self._solucao = coeficientes, intercepto
+
+        return self._solucao
+
+
+def ajustar_regressao_incremental(chunks, preprocessador, alpha=0.0):
+    """
+    Ajusta a RegressaoLinearIncremental com um iterador de blocos de dados brutos.
+
+    Parâmetros:
+        - chunks: Iterador de DataFrames com as features e o alvo (ou um único DataFrame)
+        - preprocessador: PreProcessador já ajustado, aplicado a cada bloco
+        - alpha: Penalidade Ridge (padrão é 0)
+
+    Retorna:
+        - RegressaoLinearIncremental ajustada com todos os blocos
+    """
+
+    if isinstance(chunks, pd.DataFrame):
+        chunks = [chunks]
+
+    modelo = RegressaoLinearIncremental(alpha=alpha)
+
+    for chunk in chunks:
+        modelo.partial_fit(preprocessador.transform(chunk), preprocessador.separar_alvo(chunk))
+
+    return modelo
+
+
+def ajustar_regressao_incremental_csv(caminhos_csv, preprocessador, alpha=0.0, tamanho_chunk=100_000, num_partes=None):
+    """
+    Ajusta a RegressaoLinearIncremental em paralelo: as linhas de cada planilha são divididas em intervalos, cada
+    intervalo é lido em blocos em um processo e os modelos parciais são combinados, sem carregar as planilhas inteiras
+    em memória.
+
+    Parâmetros:
+        - caminhos_csv: Caminho de uma planilha ou lista de planilhas, cada uma com o seu cabeçalho
+        - preprocessador: PreProcessador já ajustado, aplicado a cada bloco
+        - alpha: Penalidade Ridge (padrão é 0)
+        - tamanho_chunk: Quantidade de linhas lidas por vez em cada processo
+        - num_partes: Quantidade de intervalos de cada planilha (padrão é o número de CPUs)
+
+    Retorna:
+        - RegressaoLinearIncremental ajustada com todas as planilhas
+    """
+
+    intervalos = dividir_csv_em_intervalos(caminhos_csv, num_partes)
+    parciais = executar_em_shards(_ajustar_regressao_incremental_csv,
+                                  [(*intervalo, preprocessador, alpha, tamanho_chunk) for intervalo in intervalos])
+
+    return reduce(RegressaoLinearIncremental.combinar, parciais, RegressaoLinearIncremental(alpha=alpha))
+
+
+def _ajustar_regressao_incremental_csv(caminho_csv, inicio, quantidade, preprocessador, alpha, tamanho_chunk):
+    """
+    Ajusta a regressão com um intervalo de linhas de uma planilha lido em blocos.
+    """
+
+    return ajustar_regressao_incremental(ler_intervalo_csv(caminho_csv, inicio, quantidade, chunksize=tamanho_chunk),
+                                         preprocessador, alpha)
@@ -0,0 +1,224 @@
+from functools import reduce
+import numpy as np
+import pandas as pd
+
+from .utils import dividir_csv_em_intervalos, executar_em_shards, ler_intervalo_csv
+
+
+# Limite do z-score a partir do qual um valor é considerado outlier
+LIMITE_Z = 2.5
+
+
+class EstatisticasOnline:
+    """
+    Média e variância de cada coluna acumuladas bloco a bloco (algoritmo de Welford, na versão de Chan et al.
+    para combinar blocos), sem manter os dados em memória.
+
+    Dois acumuladores das mesmas colunas podem ser combinados, o que permite acumular shards em paralelo.
+    Valores ausentes são ignorados.
+
+    Parâmetros:
+        - colunas: Colunas acumuladas (padrão são as colunas numéricas do primeiro bloco)
+    """
+
+    def __init__(self, colunas=None):
+        self.colunas = None if colunas is None else list(colunas)
+        self.contagem = None
+        self.media = None
+        self.m2 = None
+
+    def atualizar(self, chunk):
+        """
+        Acumula um bloco de dados.
+
+        Parâmetros:
+            - chunk: DataFrame com as colunas acumuladas
+
+        Retorna:
+            - O próprio acumulador
+        """
+
+        if self.colunas is None:
+            self.colunas = list(chunk.select_dtypes(include='number').columns)
+
+        valores = chunk[self.colunas].to_numpy(dtype='float64', na_value=np.nan)
+        contagem = np.sum(~np.isnan(valores), axis=0)
+
+        with np.errstate(invalid='ignore'):
+            media = np.nanmean(valores, axis=0) if len(valores) else np.full(len(self.colunas), np.nan)
+            m2 = np.nansum((valores - media) ** 2, axis=0)
+
+        return self._combinar_momentos(contagem, media, m2)
+
+    def combinar(self, outra):
+        """
+        Combina com outro acumulador das mesmas colunas, como se os dois tivessem recebido todos os blocos.
+
+        Parâmetros:
+            - outra: EstatisticasOnline com as mesmas colunas
+
+        Retorna:
+            - O próprio acumulador
+        """
+
+        if outra.contagem is None:
+            return self
+
+        if self.colunas is None:
+            self.colunas = list(outra.colunas)
+        elif self.colunas != outra.colunas:
+            raise ValueError("Só é possível combinar estatísticas das mesmas colunas")
+
+        return self._combinar_momentos(outra.contagem, outra.media, outra.m2)
+
+    @property
+    def variancia(self):
+        """
+        Variância populacional (ddof=0, a mesma usada pelo stats.zscore) de cada coluna.
+        """
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return pd.Series(self.m2 / self.contagem, index=self.colunas)
+
+    @property
+    def desvio_padrao(self):
+        """
+        Desvio padrão populacional de cada coluna.
+        """
+
+        return np.sqrt(self.variancia)
+
+    def _combinar_momentos(self, contagem, media, m2):
+        """
+        Junta contagem, média e soma dos quadrados dos desvios de outro conjunto de dados aos acumulados.
+        """
+
+        if self.contagem is None:
+            self.contagem, self.media, self.m2 = contagem, np.where(contagem > 0, media, 0.0), m2
+            return self
+
+        total = self.contagem + contagem
+        delta = np.where(contagem > 0, media, 0.0) - self.media
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            peso = np.where(total > 0, contagem / total, 0.0)
+
+        self.media = self.media + delta * peso
+        self.m2 = self.m2 + m2 + delta ** 2 * self.contagem * peso
+        self.contagem = total
+
+        return self
+
+
+def acumular_estatisticas(chunks, colunas=None):
+    """
+    Primeira passada: acumula média e variância de um iterador de blocos.
+
+    Parâmetros:
+        - chunks: Iterador de DataFrames (ou um único DataFrame)
+        - colunas: Colunas acumuladas (padrão são as colunas numéricas do primeiro bloco)
+
+    Retorna:
+        - EstatisticasOnline com as estatísticas de todos os blocos
+    """
+
+    if isinstance(chunks, pd.DataFrame):
+        chunks = [chunks]
+
+    estatisticas = EstatisticasOnline(colunas)
+
+    for chunk in chunks:
+        estatisticas.atualizar(chunk)
+
+    return estatisticas
+
+
+def acumular_estatisticas_csv(caminhos_csv, colunas=None, tamanho_chunk=100_000, num_partes=None):
+    """
+    Primeira passada em paralelo: as linhas de cada planilha são divididas em intervalos, cada intervalo é acumulado
+    em um processo e os resultados são combinados.
+
+    Parâmetros:
+        - caminhos_csv: Caminho de uma planilha ou lista de planilhas, cada uma com o seu cabeçalho
+        - colunas: Colunas acumuladas (padrão são as colunas numéricas)
+        - tamanho_chunk: Quantidade de linhas lidas por vez em cada processo
+        - num_partes: Quantidade de intervalos de cada planilha (padrão é o número de CPUs)
+
+    Retorna:
+        - EstatisticasOnline com as estatísticas de todas as planilhas
+    """
+
+    intervalos = dividir_csv_em_intervalos(caminhos_csv, num_partes)
+    parciais = executar_em_shards(_acumular_estatisticas_csv,
+                                  [(*intervalo, colunas, tamanho_chunk) for intervalo in intervalos])
+
+    return reduce(EstatisticasOnline.combinar, parciais, EstatisticasOnline(colunas))
+
+
+def _acumular_estatisticas_csv(caminho_csv, inicio, quantidade, colunas, tamanho_chunk):
+    """
+    Acumula as estatísticas de um intervalo de linhas de uma planilha lido em blocos.
+    """
+
+    return acumular_estatisticas(ler_intervalo_csv(caminho_csv, inicio, quantidade, chunksize=tamanho_chunk), colunas)
+
+
+def obter_mascara_outliers(chunk, estatisticas, limite_z=LIMITE_Z):
+    """
+    Identifica os outliers de um bloco pelo z-score calculado com as estatísticas globais.
+
+    Parâmetros:
+        - chunk: DataFrame com as colunas das estatísticas
+        - estatisticas: EstatisticasOnline acumuladas na primeira passada
+        - limite_z: Limite do z-score (padrão é LIMITE_Z)
+
+    Retorna:
+        - DataFrame booleano com as mesmas colunas das estatísticas, True nos outliers
+    """
+
+    valores = chunk[estatisticas.colunas].to_numpy(dtype='float64', na_value=np.nan)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        z_scores = np.abs(valores - estatisticas.media) / estatisticas.desvio_padrao.to_numpy()
+
+    # Comparações com NaN (ausentes ou desvio zero) resultam em False
+    return pd.DataFrame(z_scores > limite_z, columns=estatisticas.colunas, index=chunk.index)
+
+
+def marcar_outliers(chunk, estatisticas, limite_z=LIMITE_Z):
+    """
+    Segunda passada: adiciona as colunas outlier_mask_<coluna> (1 nos outliers) e marca os outliers como NaN.
+
+    Parâmetros:
+        - chunk: DataFrame com as colunas das estatísticas, alterado no próprio objeto
+        - estatisticas: EstatisticasOnline acumuladas na primeira passada
+        - limite_z: Limite do z-score (padrão é LIMITE_Z)
+
+    Retorna:
+        - O próprio bloco com as máscaras e os outliers marcados
+    """
+
+    mascara = obter_mascara_outliers(chunk, estatisticas, limite_z)
+
+    for coluna in mascara.columns:
+        chunk['outlier_mask_' + coluna] = mascara[coluna].astype(int)
+        chunk[coluna] = chunk[coluna].mask(mascara[coluna])
+
+    return chunk
+
+
+def marcar_outliers_em_chunks(chunks, estatisticas, limite_z=LIMITE_Z):
+    """
+    Segunda passada sobre um iterador de blocos (ver marcar_outliers).
+
+    Parâmetros:
+        - chunks: Iterador de DataFrames
+        - estatisticas: EstatisticasOnline acumuladas na primeira passada
+        - limite_z: Limite do z-score (padrão é LIMITE_Z)
+
+    Retorna:
+        - Gerador com os blocos marcados
+    """
+
+    for chunk in chunks:
+        yield marcar_outliers(chunk, estatisticas, limite_z)
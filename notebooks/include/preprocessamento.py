@@ -0,0 +1,152 @@
+import joblib
+import numpy as np
+import os
+import pandas as pd
+from sklearn.base import BaseEstimator, TransformerMixin
+from sklearn.preprocessing import StandardScaler
+
+from .utils import ESPECIFICACAO_LIMPEZA, TIPOS_CATEGORICOS, limpar_dados
+
+
+# Caminho padrão do pré-processador ajustado
+CAMINHO_PREPROCESSADOR = "../modelos/preprocessador.joblib"
+
+# Colunas descartadas na predição do modelo (são trazidas novamente nos dados futuros)
+COLUNAS_DESCARTADAS = ['Gênero', 'Região', 'Categoria_IMC']
+
+# Colunas categóricas codificadas como números para o modelo
+COLUNAS_CODIFICADAS = ['Fumante']
+
+# Coluna alvo do modelo
+COLUNA_ALVO = 'Encargos'
+
+
+class PreProcessador(BaseEstimator, TransformerMixin):
+    """
+    Pré-processamento completo dos dados (limpeza, codificação, colunas descartadas e padronização),
+    ajustado uma única vez no treino e reutilizado, já salvo em disco, na etapa de previsão.
+
+    A codificação das colunas categóricas usa os códigos do vocabulário fixo de cada coluna (ver CATEGORIAS),
+    que são os mesmos códigos do LabelEncoder, pois as categorias estão em ordem alfabética.
+
+    Parâmetros:
+        - colunas_descartadas: Colunas removidas antes do modelo (padrão é COLUNAS_DESCARTADAS)
+        - colunas_codificadas: Colunas categóricas codificadas (padrão é COLUNAS_CODIFICADAS)
+        - coluna_alvo: Coluna alvo, removida das features quando presente (padrão é COLUNA_ALVO)
+    """
+
+    def __init__(self, colunas_descartadas=None, colunas_codificadas=None, coluna_alvo=COLUNA_ALVO):
+        self.colunas_descartadas = colunas_descartadas
+        self.colunas_codificadas = colunas_codificadas
+        self.coluna_alvo = coluna_alvo
+
+    def fit(self, dados, y=None):
+        """
+        Ajusta a padronização (StandardScaler) e guarda a ordem das features.
+
+        Parâmetros:
+            - dados: DataFrame com os dados brutos ou já limpos
+            - y: Ignorado, mantido para compatibilidade com o scikit-learn
+
+        Retorna:
+            - O próprio pré-processador ajustado
+        """
+
+        features = self._montar_features(dados)
+
+        self.colunas_ = list(features.columns)
+        self.scaler_ = StandardScaler().fit(features.to_numpy(dtype='float64'))
+
+        return self
+
+    def transform(self, dados):
+        """
+        Aplica o pré-processamento ajustado.
+
+        Parâmetros:
+            - dados: DataFrame com os dados brutos ou já limpos, ou um array NumPy com as features já
+              na ordem de colunas_ (caminho rápido usado na etapa de previsão)
+
+        Retorna:
+            - Array NumPy com as features padronizadas
+        """
+
+        if isinstance(dados, pd.DataFrame):
+            dados = self._montar_features(dados)[self.colunas_].to_numpy(dtype='float64')
+
+        # Padronização direta com a média e o desvio ajustados, sem passar pelo pandas
+        return (np.asarray(dados, dtype='float64') - self.scaler_.mean_) / self.scaler_.scale_
+
+    def separar_alvo(self, dados):
+        """
+        Obtém a coluna alvo como um array unidimensional.
+
+        Parâmetros:
+            - dados: DataFrame contendo a coluna alvo
+
+        Retorna:
+            - Array NumPy com os valores do alvo
+        """
+
+        return dados[self.coluna_alvo].to_numpy(dtype='float64')
+
+    def decodificar(self, coluna, codigos):
+        """
+        Reverte a codificação de uma coluna categórica (equivalente ao inverse_transform do LabelEncoder).
+
+        Parâmetros:
+            - coluna: Nome da coluna codificada
+            - codigos: Series ou array com os códigos
+
+        Retorna:
+            - pd.Categorical com as categorias correspondentes
+        """
+
+        return pd.Categorical.from_codes(np.asarray(codigos, dtype='int64'), dtype=TIPOS_CATEGORICOS[coluna])
+
+    def salvar(self, caminho=CAMINHO_PREPROCESSADOR):
+        """
+        Salva o pré-processador ajustado em disco.
+
+        Parâmetros:
+            - caminho: Caminho do arquivo (padrão é CAMINHO_PREPROCESSADOR)
+        """
+
+        os.makedirs(os.path.dirname(caminho) or '.', exist_ok=True)
+        joblib.dump(self, caminho)
+
+    @staticmethod
+    def carregar(caminho=CAMINHO_PREPROCESSADOR):
+        """
+        Carrega um pré-processador salvo com salvar.
+
+        Parâmetros:
+            - caminho: Caminho do arquivo (padrão é CAMINHO_PREPROCESSADOR)
+
+        Retorna:
+            - O pré-processador ajustado
+        """
+
+        return joblib.load(caminho)
+
+    def _montar_features(self, dados):
+        """
+        Limpa os dados, codifica as colunas categóricas e remove as colunas descartadas e o alvo.
+        """
+
+        colunas_descartadas = COLUNAS_DESCARTADAS if self.colunas_descartadas is None else self.colunas_descartadas
+        colunas_codificadas = COLUNAS_CODIFICADAS if self.colunas_codificadas is None else self.colunas_codificadas
+
+        remover = [coluna for coluna in [*colunas_descartadas, self.coluna_alvo] if coluna in dados.columns]
+        features = dados.drop(columns=remover)
+
+        # A limpeza só considera as colunas que sobraram; o drop já gerou uma cópia, então ela é feita no próprio objeto
+        especificacao = {coluna: regra for coluna, regra in ESPECIFICACAO_LIMPEZA.items() if coluna in features.columns}
+        limpar_dados(features, inplace=True, especificacao=especificacao)
+
+        for coluna in colunas_codificadas:
+            # Colunas que já chegam codificadas (ex: planilhas de treino e teste) são mantidas
+            if isinstance(features[coluna].dtype, pd.CategoricalDtype):
+                features[coluna] = features[coluna].cat.codes.astype('int64')
+
+        return features
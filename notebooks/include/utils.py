@@ -1,201 +1,820 @@
+from concurrent.futures import ProcessPoolExecutor
+import importlib
+import json
 import numpy as np
+import os
 import pandas as pd
-from scipy import stats
+import shutil
+import subprocess
+import sys
 
 
-def obter_csv_dados_aleatorios(num_linhas, ausencias_por_coluna):
+class ModuloSobDemanda:
+    """
+    Referência a um módulo que só é importado no primeiro acesso a um dos seus atributos.
+
+    Usada nas dependências pesadas (ex: SciPy, matplotlib) que poucas funções usam, para que processos que não
+    precisam delas (ex: os de previsão) não paguem o tempo de importação.
+
+    Parâmetros:
+        - nome: Nome completo do módulo (ex: 'scipy.stats')
+    """
+
+    def __init__(self, nome):
+        self._nome = nome
+
+    def __getattr__(self, atributo):
+        return getattr(importlib.import_module(self._nome), atributo)
+
+    def __repr__(self):
+        return f"<módulo '{self._nome}' importado sob demanda>"
+
+
+# Usado apenas nas funções de ANOVA
+stats = ModuloSobDemanda('scipy.stats')
+
+
+# Caminho padrão da planilha com os dados sintéticos
+CAMINHO_DADOS_SINTETICOS = "../planilhas/1_dados_sinteticos.csv"
+
+# Valor usado nas features categóricas quando o dado não foi informado
+NAO_INFORMADO = 'Não informado'
+
+# Vocabulário fixo de cada feature categórica. As categorias estão em ordem alfabética, a mesma ordem que
+# value_counts().sort_index() produzia quando as colunas eram do tipo object
+CATEGORIAS = {
+    'Gênero': [NAO_INFORMADO, 'feminino', 'masculino'],
+    'Fumante': [NAO_INFORMADO, 'não', 'sim'],
+    'Região': [NAO_INFORMADO, 'nordeste', 'noroeste', 'sudeste', 'sudoeste'],
+    'Categoria_IMC': ['Abaixo do peso', NAO_INFORMADO, 'Obeso', 'Peso normal', 'Sobrepeso']
+}
+
+# Tipos categóricos (pd.CategoricalDtype) de cada feature categórica
+TIPOS_CATEGORICOS = {coluna: pd.CategoricalDtype(categorias) for coluna, categorias in CATEGORIAS.items()}
+
+# Valor de preenchimento dos ausentes e tipo final (None mantém o tipo) de cada coluna na limpeza dos dados
+ESPECIFICACAO_LIMPEZA = {
+    'Idade': (0, int),
+    'Filhos': (0, int),
+    'IMC': (0, None),
+    'Gênero': (NAO_INFORMADO, None),
+    'Fumante': (NAO_INFORMADO, None),
+    'Região': (NAO_INFORMADO, None)
+}
+
+# Limites inferiores das categorias de IMC (a partir da segunda categoria) e as categorias correspondentes
+LIMITES_IMC = [18.5, 24.9, 29.9]
+CATEGORIAS_IMC = ['Abaixo do peso', 'Peso normal', 'Sobrepeso', 'Obeso']
+
+# Colunas que recebem valores ausentes na geração dos dados sintéticos
+COLUNAS_COM_AUSENCIAS = ['Idade', 'Gênero', 'IMC', 'Filhos', 'Fumante', 'Região']
+
+# Tabela de coeficientes usada no cálculo dos encargos. Pode ser substituída por outra (ver carregar_coeficientes)
+# para simular cenários de precificação sem alterar o código
+COEFICIENTES_PADRAO = {
+    # Peso de cada feature numérica
+    'numericos': {
+        'Idade': 60,  # Idade tem impacto nos encargos
+        'IMC': 30,  # tem pouco impacto nos encargos
+        'Filhos': 400  # Ter filhos aumenta o encargo
+    },
+    # Peso de cada categoria das features categóricas
+    'categoricos': {
+        'Gênero': {'masculino': 0, 'feminino': 0},  # Não tem impacto nos encargos
+        'Fumante': {'sim': 500, 'não': 0},  # Ser fumante aumenta o encargo
+        'Região': {'sudoeste': 0, 'sudeste': 0, 'nordeste': 0, 'noroeste': 0}  # Não tem impacto nos encargos
+    },
+    # Valor usado nos dados ausentes de cada coluna ('media' usa a média da própria coluna)
+    'preenchimento': {'Idade': 0, 'Filhos': 0, 'IMC': 'media', 'Fumante': 'não'},
+    # Limites do ruído uniforme somado aos encargos
+    'ruido': [100, 1000]
+}
+
+
+def obter_csv_dados_aleatorios(num_linhas, ausencias_por_coluna, tamanho_chunk=None,
+                               caminho_csv=CAMINHO_DADOS_SINTETICOS, rng=None, num_shards=1, pesos_ausencia=None):
     """
     Gera dados futuros com valores aleatórios dentro dos limites especificados para cada coluna.
 
     Parâmetros:
         - num_linhas: número de linhas a serem geradas
-        - ausencias_por_coluna: Quantidade máxima de ausência de dados nas colunas (np.nan)
+        - ausencias_por_coluna: Quantidade máxima de ausência de dados nas colunas (np.nan), ou dicionário
+          coluna: taxa de ausência (ver gerar_mascara_ausencias)
+        - tamanho_chunk: Quando informado, os dados são gerados e gravados em blocos deste tamanho (modo streaming),
+          mantendo o consumo de memória constante independente do número de linhas
+        - caminho_csv: Caminho do arquivo CSV gerado
+        - rng: np.random.Generator ou semente (int) usada na geração; None deriva do estado global do np.random
+        - num_shards: Quantidade de partes geradas em paralelo, cada uma em um processo com semente filha própria.
+          Para a mesma semente e a mesma quantidade de shards o resultado é sempre idêntico
+        - pesos_ausencia: Padrões de ausência não aleatória (ver gerar_mascara_ausencias)
 
     Retorna:
         - Retorna os dados randomicos e acordo com os parâmetros recebidos e cálculo dos coeficientes
+        - No modo streaming retorna o caminho do arquivo gerado, pois os dados nunca ficam inteiros em memória
     """
 
     try:
-        # Criar listas para cada coluna
-        idades = np.random.randint(18, 65, size=num_linhas)
-        generos = np.random.choice(['masculino', 'feminino'], size=num_linhas)
-        imcs = np.random.uniform(18, 35, size=num_linhas).astype(float)
-        filhos = np.random.randint(0, 4, size=num_linhas)
-        fumante = np.random.choice(['sim', 'não'], size=num_linhas)
-        regioes = np.random.choice(['sudoeste', 'sudeste', 'nordeste', 'noroeste'], size=num_linhas)
-
-        # Criar DataFrame com os dados gerados
-        dados = pd.DataFrame({
-            'Idade': idades,
-            'Gênero': generos,
-            'IMC': imcs,
-            'Filhos': filhos,
-            'Fumante': fumante,
-            'Região': regioes
-        })
-
-        # Introduzir valores nulos manualmente em algumas colunas
-        for coluna in dados.columns:
-            if coluna in ['Idade', 'Filhos']:
-                # Convertendo para float e depois para inteiro
-                indices_nans = np.random.choice(num_linhas, size=ausencias_por_coluna, replace=False)
-                dados.loc[indices_nans, coluna] = np.nan
-                dados[coluna] = dados[coluna].astype('Int64')
-            else:
-                indices_nans = np.random.choice(num_linhas, size=ausencias_por_coluna, replace=False)
-                dados.loc[indices_nans, coluna] = np.nan
+        gerador = obter_gerador_aleatorio(rng)
 
-        # Obtendo encargos por coeficiente
-        dados['Encargos'] = obter_encargo_por_coeficientes(dados, num_linhas)
+        if num_shards > 1:
+            return _obter_csv_dados_aleatorios_em_shards(num_linhas, ausencias_por_coluna, tamanho_chunk,
+                                                         caminho_csv, gerador, num_shards, pesos_ausencia)
 
-        # Arredondando os valores das colunas para duas casas decimais
-        dados['IMC'] = dados['IMC'].apply(lambda x: round(x, 2))
+        if tamanho_chunk is None:
+            dados = gerar_dados_aleatorios(num_linhas, ausencias_por_coluna, gerador, pesos_ausencia)
 
-        # Salvar os dados aleatorios junto dos dados originais
-        dados.to_csv("../planilhas/1_dados_sinteticos.csv", index=False, encoding='latin1')
+            # Salvar os dados aleatorios junto dos dados originais
+            dados.to_csv(caminho_csv, index=False, encoding='latin1')
 
-        # Retornar os dados concatenados
-        return dados
+            # Retornar os dados concatenados
+            return dados
+
+        # Modo streaming: cada bloco é gerado e anexado ao arquivo antes do próximo ser criado
+        chunks = gerar_dados_aleatorios_em_chunks(num_linhas, ausencias_por_coluna, tamanho_chunk, gerador,
+                                                  pesos_ausencia)
+        salvar_csv_em_chunks(chunks, caminho_csv)
+
+        return caminho_csv
 
     except Exception as e:
         print("Ocorreu uma exceção:", e)
         return None  # Certificando de que a função retorna algo, mesmo em caso de exceção
 
 
-def obter_indice_coeficientes(feature):
+def obter_gerador_aleatorio(rng=None):
+    """
+    Normaliza o parâmetro rng das funções de geração para um np.random.Generator.
+
+    Parâmetros:
+        - rng: np.random.Generator, semente (int ou np.random.SeedSequence) ou None
+
+    Retorna:
+        - np.random.Generator. Quando rng é None a semente é sorteada do estado global do np.random,
+          de forma que np.random.seed continue reproduzindo os dados
+    """
+
+    if rng is None:
+        return np.random.default_rng(np.random.randint(0, 2 ** 31 - 1))
+
+    return np.random.default_rng(rng)
+
+
+def dividir_em_shards(total, num_shards):
+    """
+    Divide uma quantidade em partes o mais próximas possível do mesmo tamanho.
+
+    Parâmetros:
+        - total: quantidade a ser dividida
+        - num_shards: número de partes
+
+    Retorna:
+        - Lista com o tamanho de cada parte
+    """
+
+    base, resto = divmod(total, num_shards)
+
+    return [base + (1 if i < resto else 0) for i in range(num_shards)]
+
+
+def executar_em_shards(funcao, argumentos_por_shard):
+    """
+    Executa a função uma vez por shard em um pool de processos, preservando a ordem dos shards no resultado.
+
+    Parâmetros:
+        - funcao: Função a ser executada (precisa ser definida no nível do módulo para ser enviada aos processos)
+        - argumentos_por_shard: Lista com a tupla de argumentos de cada shard
+
+    Retorna:
+        - Lista com o resultado de cada shard, na mesma ordem dos argumentos
+    """
+
+    if not argumentos_por_shard:
+        return []
+
+    if len(argumentos_por_shard) == 1:
+        return [funcao(*argumentos_por_shard[0])]
+
+    max_workers = min(len(argumentos_por_shard), os.cpu_count() or 1)
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(funcao, *zip(*argumentos_por_shard)))
+
+
+def _obter_csv_dados_aleatorios_em_shards(num_linhas, ausencias_por_coluna, tamanho_chunk, caminho_csv, gerador,
+                                          num_shards, pesos_ausencia):
+    """
+    Gera os dados sintéticos em shards paralelos, cada um com um gerador filho de gerador.
+    """
+
+    linhas_por_shard = dividir_em_shards(num_linhas, num_shards)
+    fronteiras = np.cumsum([0] + linhas_por_shard).tolist()
+    ausencias_por_shard = _dividir_ausencias(ausencias_por_coluna, fronteiras, num_linhas)
+    geradores = gerador.spawn(num_shards)
+
+    if tamanho_chunk is None:
+        partes = executar_em_shards(gerar_dados_aleatorios,
+                                     [(linhas, ausencias, gerador_shard, pesos_ausencia) for linhas, ausencias, gerador_shard
+                                      in zip(linhas_por_shard, ausencias_por_shard, geradores)])
+        dados = pd.concat(partes, ignore_index=True)
+        dados.to_csv(caminho_csv, index=False, encoding='latin1')
+
+        return dados
+
+    # Cada shard grava a sua parte do arquivo; as partes são unidas em ordem ao final
+    caminhos_partes = [f"{caminho_csv}.parte{i}" for i in range(num_shards)]
+    executar_em_shards(_salvar_shard_dados_aleatorios,
+                        [(linhas, ausencias, tamanho_chunk, gerador_shard, caminho_parte, i == 0, pesos_ausencia)
+                         for i, (linhas, ausencias, gerador_shard, caminho_parte)
+                         in enumerate(zip(linhas_por_shard, ausencias_por_shard, geradores, caminhos_partes))])
+
+    with open(caminho_csv, 'wb') as arquivo:
+        for caminho_parte in caminhos_partes:
+            with open(caminho_parte, 'rb') as parte:
+                shutil.copyfileobj(parte, arquivo)
+            os.remove(caminho_parte)
+
+    return caminho_csv
+
+
+def _salvar_shard_dados_aleatorios(num_linhas, ausencias_por_coluna, tamanho_chunk, rng, caminho_csv, cabecalho,
+                                   pesos_ausencia):
+    """
+    Gera e grava em streaming a parte de um shard dos dados sintéticos.
+    """
+
+    chunks = gerar_dados_aleatorios_em_chunks(num_linhas, ausencias_por_coluna, tamanho_chunk, rng, pesos_ausencia)
+
+    return salvar_csv_em_chunks(chunks, caminho_csv, cabecalho=cabecalho)
+
+
+def gerar_dados_aleatorios(num_linhas, ausencias_por_coluna, rng=None, pesos_ausencia=None):
+    """
+    Gera um bloco de dados aleatórios com as features do Tech Challenge, valores ausentes e encargos calculados.
+
+    Parâmetros:
+        - num_linhas: número de linhas a serem geradas
+        - ausencias_por_coluna: Quantidade de ausência de dados em cada coluna (np.nan), ou dicionário
+          coluna: taxa de ausência (ver gerar_mascara_ausencias)
+        - rng: np.random.Generator ou semente usada na geração
+        - pesos_ausencia: Padrões de ausência não aleatória (ver gerar_mascara_ausencias)
+
+    Retorna:
+        - DataFrame com os dados gerados
+    """
+
+    rng = obter_gerador_aleatorio(rng)
+
+    # Criar listas para cada coluna
+    idades = rng.integers(18, 65, size=num_linhas)
+    generos = _sortear_categorias(rng, 'Gênero', ['masculino', 'feminino'], num_linhas)
+    imcs = rng.uniform(18, 35, size=num_linhas).astype(float)
+    filhos = rng.integers(0, 4, size=num_linhas)
+    fumante = _sortear_categorias(rng, 'Fumante', ['sim', 'não'], num_linhas)
+    regioes = _sortear_categorias(rng, 'Região', ['sudoeste', 'sudeste', 'nordeste', 'noroeste'], num_linhas)
+
+    # Criar DataFrame com os dados gerados
+    dados = pd.DataFrame({
+        'Idade': idades,
+        'Gênero': generos,
+        'IMC': imcs,
+        'Filhos': filhos,
+        'Fumante': fumante,
+        'Região': regioes
+    })
+
+    # Introduzir valores nulos em todas as colunas de uma só vez (Idade e Filhos passam a ser Int64)
+    mascara = gerar_mascara_ausencias(dados, ausencias_por_coluna, rng, pesos_ausencia)
+    aplicar_mascara_ausencias(dados, mascara)
+
+    # Obtendo encargos por coeficiente
+    dados['Encargos'] = obter_encargo_por_coeficientes(dados, num_linhas, rng)
+
+    # Arredondando os valores das colunas para duas casas decimais
+    dados['IMC'] = dados['IMC'].round(2)
+
+    return dados
+
+
+def _sortear_categorias(rng, coluna, valores, num_linhas):
+    """
+    Sorteia valores de uma feature categórica diretamente como códigos do seu tipo categórico.
+    """
+
+    tipo = TIPOS_CATEGORICOS[coluna]
+    codigos = tipo.categories.get_indexer(valores)
+
+    return pd.Categorical.from_codes(rng.choice(codigos, size=num_linhas), dtype=tipo)
+
+
+def gerar_mascara_ausencias(dados, ausencias, rng=None, pesos_ausencia=None, colunas=None):
+    """
+    Gera a máscara de valores ausentes de todas as colunas em uma única operação vetorizada.
+
+    Parâmetros:
+        - dados: DataFrame com os valores completos (usado apenas nos padrões de ausência não aleatória)
+        - ausencias: Quantidade exata de ausências em cada coluna (int), ou dicionário coluna: taxa de ausência
+          (entre 0 e 1); colunas fora do dicionário não recebem ausências
+        - rng: np.random.Generator ou semente usada no sorteio
+        - pesos_ausencia: Padrões de ausência não aleatória (MNAR) no formato {coluna: (coluna_condição, {valor: peso})}.
+          Ex: {'IMC': ('Fumante', {'sim': 3})} faz o IMC faltar três vezes mais entre os fumantes, mantendo a
+          quantidade (ou taxa média) de ausências da coluna. Valores fora do dicionário têm peso 1
+        - colunas: Colunas que recebem ausências (padrão é COLUNAS_COM_AUSENCIAS)
+
+    Retorna:
+        - DataFrame booleano (linhas x colunas), True onde o valor deve ficar ausente
+    """
+
+    rng = obter_gerador_aleatorio(rng)
+    colunas = COLUNAS_COM_AUSENCIAS if colunas is None else list(colunas)
+    num_linhas = len(dados)
+
+    # Peso relativo de cada linha em cada coluna; None quando todas as ausências são completamente aleatórias
+    pesos = None
+    if pesos_ausencia:
+        pesos = np.ones((num_linhas, len(colunas)))
+        for j, coluna in enumerate(colunas):
+            if coluna in pesos_ausencia:
+                coluna_condicao, pesos_valores = pesos_ausencia[coluna]
+                pesos[:, j] = _obter_pesos_categoricos(dados[coluna_condicao], pesos_valores, None, padrao=1)
+
+    sorteio = rng.random((num_linhas, len(colunas)))
+
+    if isinstance(ausencias, dict):
+        taxas = np.array([ausencias.get(coluna, 0) for coluna in colunas], dtype='float64')
+
+        if pesos is not None:
+            # A probabilidade de cada linha é proporcional ao seu peso, mantendo a taxa média da coluna
+            taxas = np.minimum(taxas * pesos / pesos.mean(axis=0), 1)
+
+        return pd.DataFrame(sorteio < taxas, columns=colunas)
+
+    if ausencias > num_linhas:
+        raise ValueError("A quantidade de ausências não pode ser maior que o número de linhas")
+
+    mascara = np.zeros((num_linhas, len(colunas)), dtype=bool)
+
+    if ausencias > 0:
+        if pesos is not None:
+            # Amostragem ponderada sem reposição (Efraimidis-Spirakis): são sorteadas as maiores chaves log(u) / peso
+            with np.errstate(divide='ignore'):
+                sorteio = np.log(sorteio) / pesos
+
+        # As linhas com as maiores chaves de cada coluna ficam ausentes
+        indices = np.argpartition(sorteio, num_linhas - ausencias, axis=0)[num_linhas - ausencias:]
+        np.put_along_axis(mascara, indices, True, axis=0)
+
+    return pd.DataFrame(mascara, columns=colunas)
+
+
+def aplicar_mascara_ausencias(dados, mascara):
+    """
+    Aplica uma máscara de valores ausentes (ver gerar_mascara_ausencias) nos dados.
+
+    Colunas inteiras são convertidas diretamente para Int64 usando a própria máscara, sem passar por float.
+
+    Parâmetros:
+        - dados: dataset do Pandas, alterado no próprio objeto
+        - mascara: DataFrame booleano com as colunas a serem alteradas
+
+    Retorna:
+        - Os próprios dados, com os valores ausentes aplicados
+    """
+
+    for coluna in mascara.columns:
+        ausentes = np.ascontiguousarray(mascara[coluna].to_numpy())
+        serie = dados[coluna]
+
+        if pd.api.types.is_integer_dtype(serie.dtype) and not pd.api.types.is_extension_array_dtype(serie.dtype):
+            dados[coluna] = pd.arrays.IntegerArray(serie.to_numpy(dtype='int64'), ausentes)
+        else:
+            dados[coluna] = serie.mask(ausentes)
+
+    return dados
+
+
+def gerar_dados_aleatorios_em_chunks(num_linhas, ausencias_por_coluna, tamanho_chunk, rng=None, pesos_ausencia=None):
+    """
+    Gera os dados aleatórios em blocos de tamanho fixo, sem nunca manter o conjunto completo em memória.
+
+    Quando ausencias_por_coluna é uma quantidade, ela é distribuída proporcionalmente entre os blocos, de forma que o
+    total de valores ausentes por coluna seja exato. A média do IMC usada no cálculo dos encargos é a do bloco.
+
+    Parâmetros:
+        - num_linhas: número total de linhas a serem geradas
+        - ausencias_por_coluna: Quantidade total de ausência de dados em cada coluna (np.nan), ou dicionário
+          coluna: taxa de ausência (ver gerar_mascara_ausencias)
+        - tamanho_chunk: número de linhas de cada bloco
+        - rng: np.random.Generator ou semente usada na geração de todos os blocos
+        - pesos_ausencia: Padrões de ausência não aleatória (ver gerar_mascara_ausencias)
+
+    Retorna:
+        - Gerador de DataFrames, com índice contínuo entre os blocos
+    """
+
+    if tamanho_chunk <= 0:
+        raise ValueError("O tamanho do chunk deve ser maior que zero")
+
+    rng = obter_gerador_aleatorio(rng)
+    fronteiras = list(range(0, num_linhas, tamanho_chunk)) + [num_linhas]
+    ausencias_por_chunk = _dividir_ausencias(ausencias_por_coluna, fronteiras, num_linhas)
+
+    for inicio, fim, ausencias in zip(fronteiras[:-1], fronteiras[1:], ausencias_por_chunk):
+        chunk = gerar_dados_aleatorios(fim - inicio, ausencias, rng, pesos_ausencia)
+        chunk.index = pd.RangeIndex(inicio, fim)
+
+        yield chunk
+
+
+def _dividir_ausencias(ausencias_por_coluna, fronteiras, num_linhas):
+    """
+    Divide as ausências entre as partes delimitadas por fronteiras. Taxas (dicionário) valem igualmente para todas.
+    """
+
+    if isinstance(ausencias_por_coluna, dict):
+        return [ausencias_por_coluna] * (len(fronteiras) - 1)
+
+    if ausencias_por_coluna > num_linhas:
+        raise ValueError("A quantidade de ausências não pode ser maior que o número de linhas")
+
+    # Ausências acumuladas até cada fronteira, para que a soma das partes seja exata
+    return [fim * ausencias_por_coluna // num_linhas - inicio * ausencias_por_coluna // num_linhas
+            for inicio, fim in zip(fronteiras[:-1], fronteiras[1:])]
+
+
+def salvar_csv_em_chunks(chunks, caminho_csv, cabecalho=True):
+    """
+    Grava um iterador de DataFrames em um único CSV, escrevendo o cabeçalho apenas no primeiro bloco.
+
+    Parâmetros:
+        - chunks: Iterador de DataFrames com as mesmas colunas
+        - caminho_csv: Caminho do arquivo CSV gerado (sobrescrito se já existir)
+        - cabecalho: Se False o cabeçalho não é gravado (usado nas partes de um arquivo gerado em shards)
+
+    Retorna:
+        - Quantidade total de linhas gravadas
+    """
+
+    total_linhas = 0
+
+    for i, chunk in enumerate(chunks):
+        chunk.to_csv(caminho_csv, mode='w' if i == 0 else 'a', header=(cabecalho and i == 0), index=False,
+                     encoding='latin1')
+        total_linhas += len(chunk)
+
+    return total_linhas
+
+
+def carregar_coeficientes(caminho_json):
+    """
+    Carrega uma tabela de coeficientes de um arquivo JSON, no mesmo formato de COEFICIENTES_PADRAO.
+
+    Parâmetros:
+        - caminho_json: Caminho do arquivo JSON. Chaves ausentes no arquivo (em qualquer nível, ex: o peso de uma
+          única região) assumem o valor de COEFICIENTES_PADRAO; chaves desconhecidas geram ValueError
+
+    Retorna:
+        - Dicionário com a tabela de coeficientes
+    """
+
+    with open(caminho_json, encoding='utf-8') as arquivo:
+        coeficientes = json.load(arquivo)
+
+    return _mesclar_coeficientes(COEFICIENTES_PADRAO, coeficientes)
+
+
+def _mesclar_coeficientes(padrao, informados, secao='tabela de coeficientes'):
+    """
+    Mescla os coeficientes informados sobre os padrões seção a seção (ex: só o peso de uma região), rejeitando chaves
+    que não existem nos padrões.
+    """
+
+    if not isinstance(informados, dict):
+        raise ValueError(f"A seção '{secao}' deve ser um objeto JSON")
+
+    chaves_invalidas = set(informados) - set(padrao)
+    if chaves_invalidas:
+        raise ValueError(f"Chaves desconhecidas em '{secao}': {sorted(chaves_invalidas)}")
+
+    return {chave: _mesclar_coeficientes(valor, informados[chave], chave)
+            if isinstance(valor, dict) and chave in informados else informados.get(chave, valor)
+            for chave, valor in padrao.items()}
+
+
+def obter_indice_coeficientes(feature, coeficientes=None):
     """
     Gera o coeficiente que será usado posteriormente no cálculo dos encargos reais
 
     Parâmetros:
-        - feature: Nome da coluna
+        - feature: Nome da coluna (ou coluna_categoria para features categóricas, ex: Fumante_sim)
+        - coeficientes: Tabela de coeficientes (padrão é COEFICIENTES_PADRAO)
 
     Retorna:
         - Retorna o coeficiente de acordo com a feature passada
     """
 
-    if feature == 'Idade':
-        coeficiente = 60
-    elif feature == 'IMC':
-        coeficiente = 30
-    elif feature == 'Filhos':
-        coeficiente = 400
-    elif feature == 'Fumante_sim':
-        coeficiente = 500
-    else:
-        coeficiente = 0 # valor default caso não caia em outra condição
+    coeficientes = COEFICIENTES_PADRAO if coeficientes is None else coeficientes
+
+    if feature in coeficientes['numericos']:
+        return coeficientes['numericos'][feature]
+
+    coluna, _, categoria = feature.partition('_')
 
-    return coeficiente
+    return coeficientes['categoricos'].get(coluna, {}).get(categoria, 0)  # valor default caso não caia em outra condição
 
 
-def obter_encargo_por_coeficientes(dados, quantidade_maxima_ausencias):
+def obter_encargo_por_coeficientes(dados, quantidade_maxima_ausencias, rng=None, coeficientes=None):
     """
     Cálcula o valor dos encargos de forma aleatória, considerando algumas features com grau de impacto diferenciado
 
+    Os encargos são a soma de cada feature multiplicada pelo seu peso na tabela de coeficientes (coluna a coluna, na
+    mesma ordem e com os mesmos arredondamentos do cálculo original), mais um ruído uniforme. Os dados recebidos não são
+    copiados nem alterados.
+
     Parâmetros:
         - dados: dataset do Pandas
         - quantidade_maxima_ausencias: número de linhas a serem geradas
+        - rng: np.random.Generator ou semente usada no ruído dos encargos
+        - coeficientes: Tabela de coeficientes (padrão é COEFICIENTES_PADRAO)
 
     Retorna:
         - Retorna o valor dos encargos de acordo com o relacionamento entre features x coeficientes
     """
 
-    # Criando uma cópia de dados adicionais apenas para cálculos dos coeficientes
-    # Trato os valores ausentes da planilha mais a frente
-    # Quero exibir neste momento dados vazios nas colunas randomizadas para esta necessidade
-    dados_adicionais_aux = dados.copy()
-
-    # Preencher valores ausentes de 'Idade' e 'Filhos'
-    dados_adicionais_aux[['Idade', 'Filhos']] = dados_adicionais_aux[['Idade', 'Filhos']].fillna(0)
-
-    # Preencher valores ausentes de 'Fumante' como não
-    dados_adicionais_aux['Fumante'] = dados_adicionais_aux['Fumante'].fillna('não')
-
-    # Preencher valores ausentes de 'IMC' com a média
-    media_imc = dados_adicionais_aux['IMC'].mean()
-    dados_adicionais_aux['IMC'] = dados_adicionais_aux['IMC'].fillna(media_imc)
-
-    # Obtendo o índice dos coeficientes
-    coeficiente_idade = obter_indice_coeficientes('Idade')
-    coeficiente_genero_masculino = obter_indice_coeficientes('Gênero_masculino')
-    coeficiente_genero_feminino = obter_indice_coeficientes('Gênero_feminino')
-    coeficiente_imc = obter_indice_coeficientes('IMC')
-    coeficiente_filhos = obter_indice_coeficientes('Filhos')
-    coeficiente_fumante_sim = obter_indice_coeficientes('Fumante_sim')
-    coeficiente_fumante_nao = obter_indice_coeficientes('Fumante_não')
-    coeficiente_regiao_sudoeste = obter_indice_coeficientes('Região_sudoeste')
-    coeficiente_regiao_sudeste = obter_indice_coeficientes('Região_sudeste')
-    coeficiente_regiao_nordeste = obter_indice_coeficientes('Região_nordeste')
-    coeficiente_regiao_noroeste = obter_indice_coeficientes('Região_noroeste')
-
-    # Definindo coeficientes para cada variável independente
-    coeficientes = {
-        'Idade': coeficiente_idade,  # Idade tem impacto nos encargos
-        'Gênero': {'masculino': coeficiente_genero_masculino, 'feminino': coeficiente_genero_feminino},  # Não tem impacto nos encargos
-        'IMC': coeficiente_imc,  # tem pouco impacto nos encargos
-        'Filhos': coeficiente_filhos,  # Ter filhos aumenta o encargo
-        'Fumante': {'sim': coeficiente_fumante_sim, 'não': coeficiente_fumante_nao},  # Ser fumante aumenta o encargo
-        'Região': {'sudoeste': coeficiente_regiao_sudoeste, 'sudeste': coeficiente_regiao_sudeste, 'nordeste': coeficiente_regiao_nordeste, 'noroeste': coeficiente_regiao_noroeste}  # Não tem impacto nos encargos
-    }
-
-    # Trazendo as colunas dos coeficientes para auxiliar o treinamento do modelo
-    #dados['Coef_Idade'] = coeficientes['Idade'] * dados_adicionais_aux['Idade']
-    #dados['Coef_IMC'] = round(coeficientes['IMC'] * dados_adicionais_aux['IMC'],2)
-    #dados['Coef_Filhos'] = coeficientes['Filhos'] * dados_adicionais_aux['Filhos']
-    #dados['Coef_Fumante'] = dados_adicionais_aux['Fumante'].map(coeficientes['Fumante'])
+    coeficientes = COEFICIENTES_PADRAO if coeficientes is None else coeficientes
+    preenchimento = coeficientes.get('preenchimento', {})
+
+    encargos = np.zeros(len(dados))
+
+    # Features numéricas entram com o próprio valor multiplicado pelo seu peso, arredondado em centavos antes da soma
+    # (como no cálculo original do IMC; nas colunas inteiras o arredondamento não muda o valor)
+    for coluna, peso in coeficientes['numericos'].items():
+        if peso != 0:
+            encargos += np.round(peso * _obter_valores_numericos(dados[coluna], preenchimento.get(coluna, 0)), 2)
+
+    # Features categóricas entram já convertidas no peso da categoria de cada linha
+    for coluna, pesos_categorias in coeficientes['categoricos'].items():
+        if any(pesos_categorias.values()):
+            encargos += _obter_pesos_categoricos(dados[coluna], pesos_categorias, preenchimento.get(coluna))
 
     # Gerando encargos com base nas variáveis independentes
-    encargos = (
-            coeficientes['Idade'] * dados_adicionais_aux['Idade'] +
-            round(coeficientes['IMC'] * dados_adicionais_aux['IMC'],2) +
-            coeficientes['Filhos'] * dados_adicionais_aux['Filhos'] +
-            dados_adicionais_aux['Fumante'].map(coeficientes['Fumante']) +
-            np.random.uniform(100, 1000, size=quantidade_maxima_ausencias)
-    )
+    encargos += obter_gerador_aleatorio(rng).uniform(*coeficientes['ruido'], size=quantidade_maxima_ausencias)
 
     # Arredondando os valores das colunas para duas casas decimais
-    encargos = encargos.apply(lambda x: round(x, 2))
+    return pd.Series(np.round(encargos, 2), index=dados.index)
+
+
+def _obter_valores_numericos(serie, preenchimento):
+    """
+    Converte uma coluna numérica em um array float64, substituindo os ausentes pelo preenchimento ('media' ou valor).
+    """
+
+    valores = serie.to_numpy(dtype='float64', na_value=np.nan)
+    ausentes = np.isnan(valores)
+
+    if not ausentes.any():
+        return valores
+
+    valor = np.nanmean(valores) if preenchimento == 'media' else preenchimento
+
+    # np.where gera um novo array; to_numpy pode devolver uma view dos dados originais
+    return np.where(ausentes, valor, valores)
+
+
+def _obter_pesos_categoricos(serie, pesos_categorias, preenchimento, padrao=0):
+    """
+    Converte uma coluna categórica no peso da categoria de cada linha, com uma única fatoração da coluna.
+    Categorias fora de pesos_categorias recebem o peso padrao.
+    """
+
+    codigos, categorias = pd.factorize(serie)
+
+    # O último peso corresponde aos ausentes, pois factorize usa o código -1 para eles
+    pesos = np.array([pesos_categorias.get(categoria, padrao) for categoria in categorias] +
+                     [pesos_categorias.get(preenchimento, padrao)], dtype='float64')
 
-    return encargos
+    return pesos[codigos]
 
 
-def limpar_dados(dados):
+def limpar_dados(dados, inplace=False, especificacao=None):
     """
     Limpeza dos dados para realização do pré processamento dos dados
 
     Parâmetros:
         - dados: dataset do Pandas
+        - inplace: Se True os dados recebidos são alterados diretamente, sem a cópia do DataFrame
+        - especificacao: Dicionário coluna: (preenchimento, tipo) (padrão é ESPECIFICACAO_LIMPEZA)
 
     Retorna:
-        - Retorna os dados tratados
+        - Retorna os dados tratados (o próprio objeto recebido quando inplace=True)
     """
 
-    dados_aux = dados.copy()
+    especificacao = ESPECIFICACAO_LIMPEZA if especificacao is None else especificacao
+    dados_aux = dados if inplace else dados.copy()
+
+    converter_colunas_categoricas(dados_aux)
 
     # Caso exista, removendo linhas com valores NaN
     # dados_aux = dados_aux.dropna()
 
-    # Substituir valores nulos para o valor esperado (float e int)
-    dados_aux['Idade'] = dados_aux['Idade'].fillna(0)
-    dados_aux['Filhos'] = dados_aux['Filhos'].fillna(0)
-    dados_aux['IMC'] = dados_aux['IMC'].fillna(0)
+    # Substituir valores nulos para o valor esperado e converter para o tipo esperado em uma única passada por coluna
+    for coluna, (preenchimento, tipo) in especificacao.items():
+        dados_aux[coluna] = _preencher_e_converter(dados_aux[coluna], preenchimento, tipo)
 
-    #dados_aux['Coef_Idade'] = dados_aux['Coef_Idade'].fillna(0)
-    #dados_aux['Coef_Filhos'] = dados_aux['Coef_Filhos'].fillna(0)
-    #dados_aux['Coef_IMC'] = dados_aux['Coef_IMC'].fillna(0)
-    #dados_aux['Coef_Fumante'] = dados_aux['Coef_Fumante'].fillna(0)
+    return dados_aux
 
-    # Substituir valores nulos de faatures categóricas para o valor esperado (Não informado)
-    dados_aux['Gênero'] = dados_aux['Gênero'].fillna('Não informado')
-    dados_aux['Fumante'] = dados_aux['Fumante'].fillna('Não informado')
-    dados_aux['Região'] = dados_aux['Região'].fillna('Não informado')
 
-    # Convertendo colunas para o tipo esperado
-    dados_aux['Idade'] = dados_aux['Idade'].astype(int)
-    dados_aux['Filhos'] = dados_aux['Filhos'].astype(int)
-    #dados_aux['Coef_Idade'] = dados_aux['Coef_Idade'].astype(int)
-    #dados_aux['Coef_Filhos'] = dados_aux['Coef_Filhos'].astype(int)
+def _preencher_e_converter(serie, preenchimento, tipo):
+    """
+    Preenche os ausentes de uma coluna e converte o seu tipo, alocando no máximo um novo array.
+    """
 
-    return dados_aux
+    if tipo is not None:
+        # to_numpy faz o preenchimento e a conversão juntos (ex: Int64 com ausentes para int)
+        return serie.to_numpy(dtype=tipo, na_value=preenchimento)
+
+    if not serie.hasnans:
+        return serie
+
+    return serie.fillna(preenchimento)
+
+
+def limpar_dados_em_chunks(chunks, especificacao=None):
+    """
+    Aplica a limpeza dos dados em cada bloco de um iterador, sem nunca manter o conjunto completo em memória.
+
+    Parâmetros:
+        - chunks: Iterador de DataFrames (ex: ler_csv_dados com chunksize)
+        - especificacao: Dicionário coluna: (preenchimento, tipo) (padrão é ESPECIFICACAO_LIMPEZA)
+
+    Retorna:
+        - Gerador com os blocos tratados
+    """
+
+    for chunk in chunks:
+        # Cada bloco pertence somente a este gerador, então pode ser alterado diretamente
+        yield limpar_dados(chunk, inplace=True, especificacao=especificacao)
+
+
+def converter_colunas_categoricas(dados):
+    """
+    Converte as features categóricas conhecidas (ver CATEGORIAS) para o seu tipo categórico de vocabulário fixo.
+
+    Colunas numéricas (ex: Fumante após o LabelEncoder) e colunas ausentes no DataFrame são mantidas como estão.
+
+    Parâmetros:
+        - dados: dataset do Pandas, alterado no próprio objeto
+
+    Retorna:
+        - Os próprios dados, com as colunas convertidas
+    """
+
+    for coluna, tipo in TIPOS_CATEGORICOS.items():
+        if coluna not in dados.columns or dados[coluna].dtype == tipo or pd.api.types.is_numeric_dtype(dados[coluna]):
+            continue
+
+        serie = dados[coluna]
+        valores = serie.cat.categories if isinstance(serie.dtype, pd.CategoricalDtype) else serie.dropna().unique()
+        desconhecidos = set(valores) - set(tipo.categories)
+
+        if desconhecidos:
+            raise ValueError(f"Valores fora do vocabulário da coluna {coluna}: {sorted(map(str, desconhecidos))}")
+
+        dados[coluna] = serie.astype(tipo)
+
+    return dados
+
+
+def ler_csv_dados(caminho_csv, **kwargs):
+    """
+    Lê uma planilha do projeto já com as features categóricas no tipo categórico, sem passar pelo tipo object.
+
+    Parâmetros:
+        - caminho_csv: Caminho do arquivo CSV
+        - kwargs: Parâmetros adicionais repassados ao pd.read_csv
+
+    Retorna:
+        - DataFrame com os dados da planilha, ou um gerador de DataFrames quando chunksize é informado
+    """
+
+    # Uma amostra das primeiras linhas indica quais features categóricas estão como texto (e não codificadas)
+    amostra = pd.read_csv(caminho_csv, encoding='latin-1', nrows=1000)
+    tipos = {coluna: 'category' for coluna in amostra.columns
+             if coluna in TIPOS_CATEGORICOS and not pd.api.types.is_numeric_dtype(amostra[coluna])}
+
+    # Tipos informados por quem chama têm prioridade sobre os categóricos detectados (um tipo único vale para todas)
+    tipos_informados = kwargs.pop('dtype', {})
+    tipos = {**tipos, **tipos_informados} if isinstance(tipos_informados, dict) else tipos_informados
+
+    dados = pd.read_csv(caminho_csv, encoding='latin-1', dtype=tipos, **kwargs)
+
+    if kwargs.get('chunksize'):
+        # As categorias de cada bloco são unificadas no vocabulário fixo de cada coluna
+        return (converter_colunas_categoricas(chunk) for chunk in dados)
+
+    return converter_colunas_categoricas(dados)
+
+
+def contar_linhas_csv(caminho_csv):
+    """
+    Conta as linhas de dados de uma planilha (sem o cabeçalho) pelos bytes de quebra de linha, sem interpretar o CSV.
+
+    Parâmetros:
+        - caminho_csv: Caminho do arquivo CSV
+
+    Retorna:
+        - Quantidade de linhas de dados
+    """
+
+    linhas, ultimo_byte = 0, b'\n'
+
+    with open(caminho_csv, 'rb') as arquivo:
+        for bloco in iter(lambda: arquivo.read(1 << 20), b''):
+            linhas += bloco.count(b'\n')
+            ultimo_byte = bloco[-1:]
+
+    # A última linha pode não terminar com quebra de linha
+    if ultimo_byte != b'\n':
+        linhas += 1
+
+    return max(linhas - 1, 0)
+
+
+def dividir_csv_em_intervalos(caminhos_csv, num_partes=None):
+    """
+    Divide as linhas de uma ou mais planilhas em intervalos contíguos, para que cada intervalo seja lido em um
+    processo (ver ler_intervalo_csv).
+
+    Parâmetros:
+        - caminhos_csv: Caminho de uma planilha ou lista de planilhas, cada uma com o seu cabeçalho
+        - num_partes: Quantidade de intervalos de cada planilha (padrão é o número de CPUs)
+
+    Retorna:
+        - Lista de tuplas (caminho_csv, linha_inicial, quantidade_linhas), sem intervalos vazios
+    """
+
+    if isinstance(caminhos_csv, str):
+        caminhos_csv = [caminhos_csv]
+
+    intervalos = []
+    for caminho_csv in caminhos_csv:
+        inicio = 0
+        for quantidade in dividir_em_shards(contar_linhas_csv(caminho_csv), num_partes or os.cpu_count() or 1):
+            if quantidade:
+                intervalos.append((caminho_csv, inicio, quantidade))
+            inicio += quantidade
+
+    return intervalos
+
+
+def ler_intervalo_csv(caminho_csv, inicio, quantidade, **kwargs):
+    """
+    Lê um intervalo de linhas de dados de uma planilha (ver dividir_csv_em_intervalos), com os nomes de colunas do
+    cabeçalho e os mesmos tipos de ler_csv_dados.
+
+    Parâmetros:
+        - caminho_csv: Caminho do arquivo CSV
+        - inicio: Primeira linha de dados do intervalo (0 é a linha logo após o cabeçalho)
+        - quantidade: Quantidade de linhas do intervalo
+        - kwargs: Parâmetros adicionais repassados ao pd.read_csv (ex: chunksize)
+
+    Retorna:
+        - DataFrame com as linhas do intervalo, ou um gerador de DataFrames quando chunksize é informado
+    """
+
+    colunas = list(pd.read_csv(caminho_csv, encoding='latin-1', nrows=0).columns)
+
+    return ler_csv_dados(caminho_csv, skiprows=1 + inicio, nrows=quantidade, header=None, names=colunas, **kwargs)
+
+
+def relatorio_memoria(etapas):
+    """
+    Compara a memória ocupada por cada etapa do pipeline com as features categóricas como object (antes)
+    e como tipo categórico (depois).
+
+    Parâmetros:
+        - etapas: Dicionário com o nome da etapa e o DataFrame correspondente
+
+    Retorna:
+        - DataFrame com a memória antes e depois (em MB) e a redução percentual de cada etapa
+    """
+
+    relatorio = {}
+
+    for etapa, dados in etapas.items():
+        depois = dados.memory_usage(deep=True).sum()
+        antes = depois
+
+        # Só as colunas categóricas mudam de tamanho; as demais são iguais nas duas versões
+        for coluna in dados.select_dtypes(include='category').columns:
+            antes += (dados[coluna].astype(object).memory_usage(deep=True, index=False) -
+                      dados[coluna].memory_usage(deep=True, index=False))
+
+        relatorio[etapa] = {
+            'Antes (MB)': round(antes / 1024 ** 2, 2),
+            'Depois (MB)': round(depois / 1024 ** 2, 2),
+            'Redução (%)': round(100 * (1 - depois / antes), 2)
+        }
+
+    return pd.DataFrame.from_dict(relatorio, orient='index')
 
 
 def categorizar_imc(imc):
@@ -203,22 +822,47 @@ def categorizar_imc(imc):
     Categorizar o índice de Massa Corporal (IMC) de acordo com os valores recebidos no parâmetro
 
     Parâmetros:
-        - imc: Valor IMC capturado do dataset do Pandas
+        - imc: Valor IMC capturado do dataset do Pandas, ou uma Series/array com vários valores
+
+    Retorna:
+        - Retorna a categoria do IMC (ou as categorias, ver categorizar_imc_em_lote)
+    """
+
+    if np.ndim(imc) > 0:
+        return categorizar_imc_em_lote(imc)
+
+    return categorizar_imc_em_lote(np.array([imc], dtype='float64'))[0]
+
+
+def categorizar_imc_em_lote(imcs):
+    """
+    Categoriza vários valores de IMC de uma só vez, por busca binária nos limites de LIMITES_IMC.
+
+    Parâmetros:
+        - imcs: Series ou array com os valores de IMC (ausentes viram 'Não informado')
 
     Retorna:
-        - Retorna a categoria do IMC
+        - Series categórica (mesmo índice da Series recebida) ou pd.Categorical, quando recebe um array
     """
 
-    if imc is None or np.isnan(imc):
-        return 'Não informado'
-    if imc < 18.5:
-        return 'Abaixo do peso'
-    elif 18.5 <= imc < 24.9:
-        return 'Peso normal'
-    elif 24.9 <= imc < 29.9:
-        return 'Sobrepeso'
+    if isinstance(imcs, pd.Series):
+        valores = imcs.to_numpy(dtype='float64', na_value=np.nan)
     else:
-        return 'Obeso'
+        valores = np.asarray(imcs, dtype='float64')
+
+    tipo = TIPOS_CATEGORICOS['Categoria_IMC']
+    codigos_categorias = tipo.categories.get_indexer(CATEGORIAS_IMC)
+
+    # side='right' faz com que cada limite pertença à categoria de cima (ex: 18.5 é Peso normal)
+    codigos = codigos_categorias[np.searchsorted(LIMITES_IMC, valores, side='right')]
+    codigos[np.isnan(valores)] = tipo.categories.get_loc(NAO_INFORMADO)
+
+    categorias = pd.Categorical.from_codes(codigos, dtype=tipo)
+
+    if isinstance(imcs, pd.Series):
+        return pd.Series(categorias, index=imcs.index, name='Categoria_IMC')
+
+    return categorias
 
 
 def dados_especificos_coluna(dados, nome_coluna):
@@ -227,33 +871,69 @@ def dados_especificos_coluna(dados, nome_coluna):
     
     Parâmetros:
         - dados: DataFrame do Pandas contendo o conjunto de dados.
-        - nome_coluna: Nome da coluna da qual se deseja extrair informações.
+        - nome_coluna: Nome da coluna (ou lista de colunas) da qual se deseja extrair informações.
     
     Retorna:
         - Imprime na saída padrão informações específicas da coluna, como faixa de valores, valor mais frequente e contagem desse valor.
     """
-    
-    # Criei uma cópia auxiliar para não mudar nada ainda em dados
-    dados_aux = dados.copy()
 
-    # Obter o tipo de dados da coluna específica
-    tipo_dados_coluna = dados[nome_coluna].dtype
+    colunas = [nome_coluna] if isinstance(nome_coluna, str) else nome_coluna
+    perfil = perfilar_colunas(dados, colunas)
+
+    for coluna, info in perfil.iterrows():
+        print(f"\nNa coluna {coluna} ({info['Tipo']}) a faixa dos dados está entre: {info['Menor valor']} até {info['Maior valor']}.")
+        print(f"O valor mais frequente na coluna {coluna} é: {info['Valor mais frequente']}, que aparece {int(info['Frequência'])} vezes.")
+
 
-    dados_aux[nome_coluna] = dados_aux[nome_coluna].fillna(0)
+def perfilar_colunas(dados, colunas=None):
+    """
+    Calcula o perfil de várias colunas numéricas, lendo cada coluna uma única vez e sem copiar o DataFrame.
+
+    Assim como em dados_especificos_coluna, a faixa e o valor mais frequente consideram apenas os valores positivos
+    (ausentes e zeros são ignorados). Em caso de empate, o valor mais frequente é o menor deles.
+
+    Parâmetros:
+        - dados: DataFrame do Pandas contendo o conjunto de dados.
+        - colunas: Lista de colunas a serem analisadas (padrão são todas as colunas numéricas).
+
+    Retorna:
+        - DataFrame indexado pelo nome da coluna com o tipo, menor e maior valor, valor mais frequente,
+          sua frequência e a quantidade de valores ausentes.
+    """
+
+    if colunas is None:
+        colunas = dados.select_dtypes(include='number').columns
+
+    perfil = {}
+
+    for coluna in colunas:
+        serie = dados[coluna]
+        valores = serie.to_numpy(dtype='float64', na_value=np.nan)
+        positivos = valores[valores > 0]  # NaN nunca é maior que zero
 
-    # Converto para int para ficar melhor no print
-    if nome_coluna == "Filhos" or nome_coluna == "Idade":
-        dados_aux[nome_coluna] = dados_aux[nome_coluna].astype(int)
+        # Colunas inteiras (inclusive Int64) são exibidas como int, assim como antes
+        converter = int if pd.api.types.is_integer_dtype(serie.dtype) else float
 
-    dados_filtrados = dados_aux[dados_aux[nome_coluna] > 0]
+        if len(positivos):
+            contagens = pd.Series(positivos).value_counts(sort=False)
+            frequencia = contagens.max()
+            valor_mais_frequente = converter(contagens.index[contagens.to_numpy() == frequencia].min())
+            menor_valor, maior_valor = converter(positivos.min()), converter(positivos.max())
+        else:
+            frequencia = 0
+            valor_mais_frequente = menor_valor = maior_valor = None
 
-    menor_valor = dados_filtrados[nome_coluna].min()
-    maior_valor = dados_filtrados[nome_coluna].max()
-    valor_mais_frequente = dados_filtrados[nome_coluna].mode()[0]
-    contador = dados_filtrados[dados_filtrados[nome_coluna] == valor_mais_frequente].shape[0]
+        perfil[coluna] = {
+            'Tipo': serie.dtype,
+            'Menor valor': menor_valor,
+            'Maior valor': maior_valor,
+            'Valor mais frequente': valor_mais_frequente,
+            'Frequência': int(frequencia),
+            'Ausentes': int(np.isnan(valores).sum())
+        }
 
-    print(f"\nNa coluna {nome_coluna} ({tipo_dados_coluna}) a faixa dos dados está entre: {menor_valor} até {maior_valor}.")
-    print(f"O valor mais frequente na coluna {nome_coluna} é: {valor_mais_frequente}, que aparece {int(contador)} vezes.")
+    # dtype object preserva os inteiros das colunas inteiras ao lado dos floats das demais
+    return pd.DataFrame(list(perfil.values()), index=list(perfil), dtype=object)
 
 
 def prever_encargos_futuros(best_model, dados):
@@ -390,7 +1070,7 @@ def planejamento_estrategico(best_model, dados, encargos_futuros):
     return sugestoes_estrategicas
 
     
-def verificar_se_modelo_tem_dados_nan_inf(model, x, y):
+def verificar_se_modelo_tem_dados_nan_inf(model, x, y, ajustar=True):
     """
     Verifica se há valores NaN ou Inf em um modelo após o treinamento.
 
@@ -398,11 +1078,14 @@ def verificar_se_modelo_tem_dados_nan_inf(model, x, y):
         - model: Modelo de regressão do scikit-learn.
         - x: Matriz de features.
         - y: Vetor de targets.
+        - ajustar: Ajusta o modelo antes da verificação. Use False para verificar um modelo já ajustado com x e y,
+          sem treiná-lo novamente.
     """
 
     # isinf = é uma função que verifica se um ou mais elementos de um array são infinitos(infinito positivo ou negativo)
 
-    model.fit(x, y)
+    if ajustar:
+        model.fit(x, y)
 
     # Verificação de NaN e Inf nos coeficientes (se aplicável)
     if hasattr(model, "coef_"):
@@ -419,7 +1102,7 @@ def verificar_se_modelo_tem_dados_nan_inf(model, x, y):
         raise ValueError("Inf encontrado nas previsões do modelo")
 
 
-def gerar_dados_futuros_com_limites(novas_linhas, x_test, idade_minima=18):
+def gerar_dados_futuros_com_limites(novas_linhas, x_test, idade_minima=18, rng=None, num_shards=1):
     """
     Gera dados futuros com valores aleatórios dentro dos limites especificados para cada coluna.
 
@@ -427,12 +1110,15 @@ def gerar_dados_futuros_com_limites(novas_linhas, x_test, idade_minima=18):
         - novas_linhas: número de linhas a serem geradas
         - x_test: DataFrame contendo os dados de teste
         - idade_minima: Limite inferior para a coluna 'Idade' (padrão é 18 anos)
+        - rng: np.random.Generator ou semente usada na geração; None deriva do estado global do np.random
+        - num_shards: Quantidade de partes geradas em paralelo, cada uma com semente filha própria
 
     Retorna:
         - DataFrame contendo os dados futuros gerados
     """
-    
-    dados_futuros = pd.DataFrame()
+
+    # Os limites são calculados uma única vez, assim x_test não precisa ser enviado aos processos
+    limites = []
 
     for coluna in x_test.columns:
         if x_test[coluna].dtype == 'int64' or x_test[coluna].dtype == 'int32':
@@ -442,10 +1128,34 @@ def gerar_dados_futuros_com_limites(novas_linhas, x_test, idade_minima=18):
             else:
                 minimo = int(x_test[coluna].min())
 
-            maximo = int(x_test[coluna].max())
-            valores = np.random.randint(minimo, maximo + 1, size=novas_linhas).astype(x_test[coluna].dtype)
+            limites.append((coluna, minimo, int(x_test[coluna].max()), x_test[coluna].dtype))
         else:
-            valores = np.round(np.random.uniform(x_test[coluna].min(), x_test[coluna].max(), size=novas_linhas), 2)
+            limites.append((coluna, x_test[coluna].min(), x_test[coluna].max(), None))
+
+    gerador = obter_gerador_aleatorio(rng)
+
+    if num_shards <= 1:
+        return _gerar_shard_dados_futuros(novas_linhas, limites, gerador)
+
+    partes = executar_em_shards(_gerar_shard_dados_futuros,
+                                 [(linhas, limites, gerador_shard) for linhas, gerador_shard
+                                  in zip(dividir_em_shards(novas_linhas, num_shards), gerador.spawn(num_shards))])
+
+    return pd.concat(partes, ignore_index=True)
+
+
+def _gerar_shard_dados_futuros(novas_linhas, limites, rng):
+    """
+    Gera a parte de um shard dos dados futuros a partir dos limites (coluna, mínimo, máximo, tipo) de cada coluna.
+    """
+
+    dados_futuros = pd.DataFrame()
+
+    for coluna, minimo, maximo, tipo in limites:
+        if tipo is not None:
+            valores = rng.integers(minimo, maximo + 1, size=novas_linhas).astype(tipo)
+        else:
+            valores = np.round(rng.uniform(minimo, maximo, size=novas_linhas), 2)
 
         dados_futuros[coluna] = valores
 
@@ -466,8 +1176,114 @@ def anova_correlation(df, numeric_col, categorical_col):
         - p_value: valor p associado ao teste ANOVA
     """
 
-    groups = df.groupby(categorical_col)
+    # observed=True ignora as categorias sem registros, que gerariam grupos vazios no teste
+    groups = df.groupby(categorical_col, observed=True)
     samples = [group[numeric_col].values for _, group in groups]
     f_statistic, p_value = stats.f_oneway(*samples)
     
-    return f_statistic, p_value
\ No newline at end of file
+    return f_statistic, p_value
+
+
+def anova_correlation_matrix(df, numeric_cols, categorical_cols):
+    """
+    Calcula o teste ANOVA de todos os pares (variável categórica, variável numérica) de uma só vez.
+
+    Para cada variável categórica é feita uma única agregação (contagem, soma e soma dos quadrados por grupo)
+    de todas as variáveis numéricas juntas, da qual saem as estatísticas F de todas elas. O resultado é o mesmo
+    de chamar anova_correlation para cada par.
+
+    Parâmetros:
+        - df: DataFrame contendo os dados
+        - numeric_cols: lista das colunas numéricas
+        - categorical_cols: lista das colunas categóricas
+
+    Retorna:
+        - f_statistic: DataFrame (categóricas x numéricas) com as estatísticas F
+        - p_value: DataFrame (categóricas x numéricas) com os valores p
+    """
+
+    numeric_cols = list(numeric_cols)
+    categorical_cols = list(categorical_cols)
+
+    # Centralizar pela média de cada coluna reduz o erro numérico das somas dos quadrados
+    valores = df[numeric_cols].to_numpy(dtype='float64', na_value=np.nan)
+    valores = valores - np.nanmean(valores, axis=0)
+
+    f_statistic = pd.DataFrame(np.nan, index=categorical_cols, columns=numeric_cols)
+    p_value = pd.DataFrame(np.nan, index=categorical_cols, columns=numeric_cols)
+
+    for cat_col in categorical_cols:
+        codigos, _ = pd.factorize(df[cat_col])
+
+        # Linhas sem categoria ficam fora dos grupos, assim como no groupby
+        validos = codigos >= 0
+        codigos, valores_validos = codigos[validos], valores[validos]
+
+        contagens = np.bincount(codigos)
+        presentes = contagens > 0
+        contagens = contagens[presentes]
+        num_grupos = len(contagens)
+        num_linhas = contagens.sum()
+
+        if num_grupos < 2 or num_linhas <= num_grupos:
+            continue
+
+        # Soma e soma dos quadrados por grupo (grupos x colunas); NaN em um grupo propaga para a coluna, como no f_oneway
+        somas = np.stack([np.bincount(codigos, weights=coluna) for coluna in valores_validos.T], axis=1)
+        somas_quadrados = np.stack([np.bincount(codigos, weights=coluna ** 2) for coluna in valores_validos.T], axis=1)
+        somas, somas_quadrados = somas[presentes], somas_quadrados[presentes]
+
+        soma_entre_grupos = (somas ** 2 / contagens[:, None]).sum(axis=0)
+        ss_entre = soma_entre_grupos - somas.sum(axis=0) ** 2 / num_linhas
+        ss_dentro = somas_quadrados.sum(axis=0) - soma_entre_grupos
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            f = (ss_entre / (num_grupos - 1)) / (ss_dentro / (num_linhas - num_grupos))
+
+        f_statistic.loc[cat_col] = f
+        p_value.loc[cat_col] = stats.f.sf(f, num_grupos - 1, num_linhas - num_grupos)
+
+    return f_statistic, p_value
+
+
+# Módulos do include medidos por padrão em medir_tempo_importacao
+MODULOS_INCLUDE = ['include.utils', 'include.preprocessamento', 'include.estatisticas', 'include.outliers',
+                   'include.graficos']
+
+# Dependências pesadas cuja importação é verificada em medir_tempo_importacao
+DEPENDENCIAS_PESADAS = ['scipy', 'matplotlib', 'sklearn']
+
+
+def medir_tempo_importacao(modulos=None, repeticoes=5):
+    """
+    Mede o tempo de importação de cada módulo, sempre em um interpretador novo (sem nada em cache na memória).
+
+    Parâmetros:
+        - modulos: Lista de módulos (padrão é MODULOS_INCLUDE)
+        - repeticoes: Quantidade de medições de cada módulo; o resultado é a mediana
+
+    Retorna:
+        - DataFrame com o tempo de importação (segundos) de cada módulo e quais dependências pesadas ele carregou
+    """
+
+    modulos = MODULOS_INCLUDE if modulos is None else modulos
+    pasta_include = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+    codigo = ("import json, sys, time\n"
+              "inicio = time.perf_counter()\n"
+              "import {modulo}\n"
+              "tempo = time.perf_counter() - inicio\n"
+              "print(json.dumps([tempo, [nome in sys.modules for nome in {dependencias}]]))")
+
+    resultado = {}
+    for modulo in modulos:
+        medicoes = []
+        for _ in range(repeticoes):
+            saida = subprocess.run([sys.executable, '-c', codigo.format(modulo=modulo, dependencias=DEPENDENCIAS_PESADAS)],
+                                   cwd=pasta_include, capture_output=True, text=True, check=True).stdout
+            medicoes.append(json.loads(saida))
+
+        resultado[modulo] = [float(np.median([tempo for tempo, _ in medicoes]))] + medicoes[-1][1]
+
+    return pd.DataFrame.from_dict(resultado, orient='index',
+                                  columns=['Tempo (s)'] + [f'Carrega {nome}' for nome in DEPENDENCIAS_PESADAS])